@@ -0,0 +1,186 @@
+"""
+HTTP/JSON generation API served next to the NiceGUI page.
+
+runner.py mounts the router on NiceGUI's FastAPI app:
+
+    POST /generate        {"max_words": 50}                 -> {"text": "..."}
+    POST /generate        {"max_words": 50, "stream": true} -> text/event-stream, one word per event
+    POST /generate/batch  {"count": 10, "max_words": 50}    -> {"texts": ["...", ...]}
+    GET  /generate/stats                                    -> admission and batching counters
+
+Generation runs in the thread pool so the event loop keeps serving websocket
+clients while responses are sampled from the preloaded model. Single requests
+go through a micro-batching scheduler shared with the chat page, and every
+request needs a slot from the shared admission controller: overload is
+answered with 503 (queue full) or 429 (client rate limit) and a Retry-After.
+"""
+import math
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from lib import MarkovGenerator
+from lib.AdmissionControl import AdmissionControl, RateLimited, Rejected
+from lib.BatchScheduler import BatchScheduler
+
+MAX_WORDS_LIMIT = 1000
+MAX_BATCH = 100
+
+router = APIRouter(prefix='/generate', tags=['generate'])
+
+
+def _run_batch(count, max_words):
+    # Resolved at call time so the generator can be swapped (and patched in tests)
+    return MarkovGenerator.run_batch(count, max_words)
+
+
+scheduler = BatchScheduler(
+    _run_batch,
+    window=MarkovGenerator.env.get_batch_window_ms() / 1000,
+    max_batch=MarkovGenerator.env.get_batch_size(),
+)
+
+admission = AdmissionControl(
+    max_concurrent=MarkovGenerator.env.get_max_concurrent(),
+    max_queue=MarkovGenerator.env.get_max_queue(),
+    rate=MarkovGenerator.env.get_rate_limit(),
+    burst=MarkovGenerator.env.get_rate_burst(),
+    queue_timeout=MarkovGenerator.env.get_queue_timeout(),
+)
+
+
+class GenerateRequest(BaseModel):
+    max_words: Optional[int] = Field(None, ge=1, le=MAX_WORDS_LIMIT, description='defaults to MAX_WORDS')
+    stream: bool = Field(False, description='stream words as server-sent events')
+
+
+class GenerateResponse(BaseModel):
+    text: str
+
+
+class BatchRequest(BaseModel):
+    count: int = Field(1, ge=1, le=MAX_BATCH)
+    max_words: Optional[int] = Field(None, ge=1, le=MAX_WORDS_LIMIT, description='defaults to MAX_WORDS')
+
+
+class BatchResponse(BaseModel):
+    texts: List[str]
+
+
+def _events(max_words):
+    """
+    Format a streamed response as server-sent events.
+
+    Args:
+        max_words: Maximum number of words, or None for MAX_WORDS
+
+    Yields:
+        One ``data:`` event per word, then an ``end`` event
+    """
+    for word in MarkovGenerator.stream(max_words):
+        yield f'data: {word}\n\n'
+    yield 'event: end\ndata: \n\n'
+
+
+class _Slot:
+    """Admission slot of one request, released at most once."""
+
+    def __init__(self, controller: AdmissionControl):
+        self._controller = controller
+        self._held = True
+
+    def release(self):
+        if self._held:
+            self._held = False
+            self._controller.release()
+
+
+class _AdmittedStream(StreamingResponse):
+    """
+    Streaming response that releases its admission slot however the response ends.
+
+    The body generator alone cannot do it: when sending the response start
+    fails (client already gone), the generator is never started, so its
+    finally block never runs.
+    """
+
+    def __init__(self, content, slot: _Slot, **kwargs):
+        super().__init__(content, **kwargs)
+        self._slot = slot
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._slot.release()
+
+
+async def _admitted_events(max_words, slot: _Slot):
+    """
+    Stream _events in the thread pool, releasing the admission slot when done.
+
+    Args:
+        max_words: Maximum number of words, or None for MAX_WORDS
+        slot: Admission slot held by the request
+
+    Yields:
+        The server-sent events of _events
+    """
+    try:
+        async for event in iterate_in_threadpool(_events(max_words)):
+            yield event
+    finally:
+        # Frees the slot as soon as generation ends, before the response is torn down
+        slot.release()
+
+
+async def _admit(http_request: Request):
+    """
+    Take an admission slot for the calling client.
+
+    Args:
+        http_request: Incoming request, identifying the client by address
+
+    Raises:
+        HTTPException: 429 when the client is rate limited, 503 when the server is busy
+    """
+    client = http_request.client.host if http_request.client else None
+    try:
+        await admission.acquire(client)
+    except Rejected as error:
+        status = 429 if isinstance(error, RateLimited) else 503
+        raise HTTPException(status, str(error), headers={'Retry-After': str(math.ceil(error.retry_after))})
+
+
+@router.post('', response_model=GenerateResponse)
+async def generate(http_request: Request, request: Optional[GenerateRequest] = None):
+    request = request or GenerateRequest()
+    await _admit(http_request)
+    if request.stream:
+        # The slot is held until the stream ends, or the response fails before it starts
+        slot = _Slot(admission)
+        return _AdmittedStream(_admitted_events(request.max_words, slot), slot, media_type='text/event-stream')
+    try:
+        text = await scheduler.submit(request.max_words)
+    finally:
+        admission.release()
+    return GenerateResponse(text=text)
+
+
+@router.post('/batch', response_model=BatchResponse)
+async def generate_batch(http_request: Request, request: Optional[BatchRequest] = None):
+    request = request or BatchRequest()
+    await _admit(http_request)
+    try:
+        texts = await run_in_threadpool(MarkovGenerator.run_batch, request.count, request.max_words)
+    finally:
+        admission.release()
+    return BatchResponse(texts=texts)
+
+
+@router.get('/stats')
+async def stats():
+    return {'admission': admission.stats(), 'batching': scheduler.stats()}
@@ -0,0 +1,182 @@
+"""
+Module for admission control of generation requests.
+
+At most max_concurrent requests generate at once. Up to max_queue more wait
+for a slot in arrival order; anything beyond that is rejected immediately with
+Busy, so a burst degrades into fast "try again" answers instead of every
+connection timing out together. Each client also has a token bucket that
+limits its sustained request rate.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+# Token buckets kept before idle (full) ones are dropped
+MAX_CLIENTS = 10000
+
+# Seconds suggested to clients turned away with Busy
+BUSY_RETRY_AFTER = 1.0
+
+
+class Rejected(Exception):
+    """Request refused by admission control."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Busy(Rejected):
+    """Every slot is taken and the wait queue is full (or the wait timed out)."""
+
+
+class RateLimited(Rejected):
+    """The client sent more requests than its rate limit allows."""
+
+
+class AdmissionControl:
+    """
+    Concurrency limit with a bounded FIFO wait queue and per-client rate limits.
+
+    Use `async with admission.admit(client): ...` around the generation, or
+    acquire() and release() when the slot outlives the handler (streaming).
+    """
+
+    def __init__(self, max_concurrent: int = 16, max_queue: int = 32, rate: float = 0.0,
+                 burst: int = 5, queue_timeout: float = None, clock=time.monotonic):
+        """
+        Create an admission controller.
+
+        Args:
+            max_concurrent: Requests allowed to generate at the same time
+            max_queue: Requests allowed to wait for a slot; more are rejected with Busy
+            rate: Sustained requests per second per client (0 disables rate limiting)
+            burst: Requests a client may send at once before the rate applies
+            queue_timeout: Seconds a queued request waits before Busy (None waits forever)
+            clock: Monotonic time function, replaceable in tests
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.queue_timeout = queue_timeout
+        self._clock = clock
+        self._active = 0
+        self._waiters = deque()
+        self._buckets = {}
+        self.admitted = 0
+        self.rejected_busy = 0
+        self.rejected_rate = 0
+        self.timed_out = 0
+
+    async def acquire(self, client=None):
+        """
+        Wait for a generation slot.
+
+        Args:
+            client: Key identifying the client for rate limiting (None skips the limit)
+
+        Raises:
+            RateLimited: If the client exceeded its rate
+            Busy: If the wait queue is full or the wait timed out
+        """
+        if client is not None and self.rate > 0:
+            self._check_rate(client)
+
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_busy += 1
+            raise Busy('Server busy, try again shortly', BUSY_RETRY_AFTER)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as error:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self.release()
+            elif future in self._waiters:
+                self._waiters.remove(future)
+            if isinstance(error, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise Busy('Server busy, try again shortly', BUSY_RETRY_AFTER) from None
+            raise
+        self.admitted += 1
+
+    def release(self):
+        """Give the slot to the next waiting request, or free it."""
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                # The slot changes hands without becoming free
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def admit(self, client=None):
+        """
+        Hold a generation slot for the duration of the block.
+
+        Args:
+            client: Key identifying the client for rate limiting
+
+        Raises:
+            RateLimited: If the client exceeded its rate
+            Busy: If the wait queue is full or the wait timed out
+        """
+        await self.acquire(client)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        """
+        Get the current load and rejection counters.
+
+        Returns:
+            Dictionary with active and queued requests, limits and counters
+        """
+        return {
+            'active': self._active,
+            'queued': len(self._waiters),
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'admitted': self.admitted,
+            'rejected_busy': self.rejected_busy,
+            'rejected_rate': self.rejected_rate,
+            'timed_out': self.timed_out,
+        }
+
+    def _check_rate(self, client):
+        """
+        Take one token from the client's bucket.
+
+        Args:
+            client: Key identifying the client
+
+        Raises:
+            RateLimited: If the bucket is empty
+        """
+        now = self._clock()
+        tokens, stamp = self._buckets.get(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - stamp) * self.rate)
+        if tokens < 1:
+            self._buckets[client] = (tokens, now)
+            self.rejected_rate += 1
+            raise RateLimited('Too many requests, slow down', (1 - tokens) / self.rate)
+        self._buckets[client] = (tokens - 1, now)
+        if len(self._buckets) > MAX_CLIENTS:
+            self._forget_idle(now)
+
+    def _forget_idle(self, now: float):
+        # A bucket that has refilled completely is the same as no bucket
+        refill = self.burst / self.rate
+        self._buckets = {client: bucket for client, bucket in self._buckets.items()
+                         if now - bucket[1] < refill}
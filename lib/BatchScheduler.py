@@ -0,0 +1,116 @@
+"""
+Module for micro-batching concurrent generation requests.
+
+Requests that arrive within a short window (or until the batch is full) are
+answered by one batched generation call, run in an executor so the event loop
+stays free. Each request waits at most the window before its batch starts.
+"""
+import asyncio
+from collections import defaultdict
+
+
+class BatchScheduler:
+    """
+    Collect concurrent requests and run them as batched generation calls.
+
+    Requests are grouped by max_words, since one batch call produces
+    responses of a single length.
+    """
+
+    def __init__(self, run_batch, window: float = 0.01, max_batch: int = 16, executor=None):
+        """
+        Create a scheduler.
+
+        Args:
+            run_batch: Function (count, max_words) -> list of responses, such as
+                MarkovGenerator.run_batch; called in the executor
+            window: Seconds to wait for more requests after the first one
+            max_batch: Pending requests that trigger a batch immediately
+            executor: concurrent.futures executor (default: the loop's default)
+        """
+        self._run_batch = run_batch
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._executor = executor
+        self._pending = defaultdict(list)
+        self._pending_count = 0
+        self._timer = None
+        self.batches = 0
+        self.requests = 0
+
+    async def submit(self, max_words: int = None) -> str:
+        """
+        Queue one request and wait for its response.
+
+        Args:
+            max_words: Maximum number of words; None for MAX_WORDS
+
+        Returns:
+            Generated text string
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending[max_words].append(future)
+        self._pending_count += 1
+        self.requests += 1
+
+        if self._pending_count >= self.max_batch or self.window <= 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def stats(self) -> dict:
+        """
+        Get batching counters.
+
+        Returns:
+            Dictionary with requests, batches, average batch size and pending requests
+        """
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'average_batch': self.requests / self.batches if self.batches else 0.0,
+            'pending': self._pending_count,
+        }
+
+    def _flush(self):
+        """Start one batch call per max_words group for everything pending."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, defaultdict(list)
+        self._pending_count = 0
+
+        loop = asyncio.get_running_loop()
+        for max_words, futures in pending.items():
+            futures = [future for future in futures if not future.done()]
+            if not futures:
+                continue
+            self.batches += 1
+            call = loop.run_in_executor(self._executor, self._run_batch, len(futures), max_words)
+            call.add_done_callback(lambda call, futures=futures: _deliver(call, futures))
+
+
+def _deliver(call, futures):
+    """
+    Fan the results of a batch call back to the waiting requests.
+
+    Args:
+        call: Finished future of the batch call
+        futures: Futures of the requests in the batch, in order
+    """
+    if call.cancelled():
+        for future in futures:
+            future.cancel()
+        return
+    error = call.exception()
+    results = [None] * len(futures) if error else call.result()
+    for future, result in zip(futures, results):
+        if future.done():
+            # The waiting request was cancelled meanwhile
+            continue
+        if error:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
@@ -0,0 +1,324 @@
+"""
+Command line interface for offline model compilation, generation and profiling.
+
+Usage:
+    python -m lib compile [--files a.txt,b.txt] [--prefix-len 2 3] [--output cache] [--memory-budget 256M]
+                          [--min-count 2] [--collapse-chains] [--max-vocab 20000]
+    python -m lib generate [-n 10] [--workers 4] [--model cache/model_p2.pkl]
+    python -m lib profile [-n 100] [--top 20] [--sort cumulative]
+    python -m lib share (--output cache/model_p2.bin | --name markov) [--prefix-len 2]
+    python -m lib stats [--files a.txt,b.txt] [--prefix-len 2 3] [--json stats.json]
+    python -m lib loadtest [--clients 20] [--duration 30] [--config "TEMPERATURE=0 MAX_WORDS=50" ...]
+"""
+import argparse
+import cProfile
+import io
+import json
+import pstats
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from lib import Compaction, MarkovGenerator, ModelCache, StreamingBuilder
+
+_worker_model = None
+
+
+def _filenames(value):
+    """
+    Split a comma-separated --files value.
+
+    Args:
+        value: Comma-separated filenames, or None to use INPUT_FILENAME
+
+    Returns:
+        List of filenames or None
+    """
+    if value is None:
+        return None
+    return [name for name in value.split(',') if name]
+
+
+def _size(value):
+    """
+    Parse a byte size such as 512K, 256M or 2G.
+
+    Args:
+        value: Size with an optional K, M or G suffix
+
+    Returns:
+        Size in bytes
+    """
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    value = value.strip().upper().rstrip('B')
+    try:
+        if value and value[-1] in units:
+            return int(float(value[:-1]) * units[value[-1]])
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid size: {value!r}')
+
+
+def _load_model(args, prefix_len):
+    """
+    Load the model from --model when given, otherwise build it from the corpora.
+
+    Args:
+        args: Parsed command line arguments
+        prefix_len: Length of the prefix used when building
+
+    Returns:
+        Dictionary mapping prefix tuples to lists of possible next words
+    """
+    if args.model:
+        return ModelCache.load(args.model)
+    file_paths = MarkovGenerator._file_path(_filenames(args.files))
+    return MarkovGenerator.build(prefix_len, file_paths)
+
+
+def _init_worker(args, prefix_len):
+    """Load the model once per worker process."""
+    global _worker_model
+    _worker_model = _load_model(args, prefix_len)
+
+
+def _worker_sample(max_words):
+    """Generate one response in a worker process."""
+    return MarkovGenerator.sample(_worker_model, max_words)
+
+
+def _compile(args):
+    file_paths = MarkovGenerator._file_path(_filenames(args.files))
+    options = Compaction.options(args.min_count, args.collapse_chains, args.max_vocab)
+    if args.memory_budget:
+        return _compile_streaming(args, file_paths, options)
+    for prefix_len in args.prefix_len:
+        start = time.perf_counter()
+        possibles = MarkovGenerator.build(prefix_len, file_paths)
+        full = possibles
+        if options:
+            possibles = Compaction.compact(possibles, **options)
+        fingerprint = ModelCache.fingerprint(file_paths, prefix_len, options)
+        path = ModelCache.save(possibles, ModelCache.model_path(args.output, prefix_len), fingerprint)
+        elapsed = time.perf_counter() - start
+        print(f'{path}: {len(possibles)} prefixes (prefix_len={prefix_len}) in {elapsed:.2f}s')
+        if options:
+            _print_report(Compaction.report(full, possibles))
+    return 0
+
+
+def _compile_streaming(args, file_paths, options):
+    # The model is never in memory, so only the per-prefix min_count pass applies
+    unsupported = sorted(set(options) - {'min_count'})
+    if unsupported:
+        names = ', '.join('--' + name.replace('_', '-') for name in unsupported)
+        print(f'error: {names} need the whole model in memory and cannot be used with --memory-budget',
+              file=sys.stderr)
+        return 2
+    for prefix_len in args.prefix_len:
+        start = time.perf_counter()
+        fingerprint = ModelCache.fingerprint(file_paths, prefix_len, options)
+        path = ModelCache.model_path(args.output, prefix_len)
+        prefixes = StreamingBuilder.build_file(file_paths, prefix_len, path, fingerprint, args.memory_budget,
+                                               min_count=options.get('min_count', 1))
+        elapsed = time.perf_counter() - start
+        print(f'{path}: {prefixes} prefixes (prefix_len={prefix_len}) in {elapsed:.2f}s')
+    return 0
+
+
+def _print_report(report):
+    saved = report['bytes_saved'] / max(report['bytes_before'], 1)
+    print(f"  compaction: {report['prefixes_before']} -> {report['prefixes_after']} prefixes, "
+          f"{report['bytes_before'] / 1e6:.1f} MB -> {report['bytes_after'] / 1e6:.1f} MB "
+          f"({saved:.0%} saved), sampling {report['speedup']:.2f}x faster")
+
+
+def _generate(args):
+    prefix_len = args.prefix_len or MarkovGenerator.prefix_len()
+    max_words = args.max_words or MarkovGenerator.env.get_max_words()
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                 initargs=(args, prefix_len)) as executor:
+            chunksize = max(1, args.count // (args.workers * 4))
+            responses = list(executor.map(_worker_sample, [max_words] * args.count, chunksize=chunksize))
+    else:
+        possibles = _load_model(args, prefix_len)
+        responses = [MarkovGenerator.sample(possibles, max_words) for _ in range(args.count)]
+    print('\n\n'.join(responses))
+    return 0
+
+
+def _profile(args):
+    prefix_len = args.prefix_len or MarkovGenerator.prefix_len()
+    max_words = args.max_words or MarkovGenerator.env.get_max_words()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    possibles = _load_model(args, prefix_len)
+    for _ in range(args.count):
+        MarkovGenerator.sample(possibles, max_words)
+    profiler.disable()
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats(args.sort).print_stats(args.top)
+    print(stream.getvalue())
+    return 0
+
+
+def _share(args):
+    prefix_len = args.prefix_len or MarkovGenerator.prefix_len()
+    file_paths = MarkovGenerator._file_path(_filenames(args.files))
+    possibles = MarkovGenerator._load_or_build(prefix_len, file_paths)
+    # Workers check it without the corpora; _load_or_build already rebuilt the model if they changed
+    fingerprint = ModelCache.fingerprint(file_paths, prefix_len, MarkovGenerator._compaction_options(),
+                                         contents=False)
+
+    from lib.SharedModel import SharedModel
+    if args.output:
+        path = SharedModel.save(possibles, args.output, fingerprint)
+        print(f'{path}: {len(possibles)} prefixes, {path.stat().st_size} bytes; '
+              f'run workers with SHARED_MODEL={path}')
+        return 0
+
+    model = SharedModel.publish(possibles, args.name, fingerprint)
+    print(f'published {len(model)} prefixes, {model.nbytes} bytes; '
+          f'run workers with SHARED_MODEL=shm:{model.name}', flush=True)
+    # The segment lives as long as this process: stop it to unlink the model
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        while True:
+            signal.pause()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        model.close()
+        model.unlink()
+    return 0
+
+
+def _stats(args):
+    from lib import ModelStats
+    corpora = ModelStats.report(_filenames(args.files), args.prefix_len)
+    for corpus in corpora:
+        tokens = corpus['tokens']
+        print(f"{','.join(corpus['files'])}: {tokens['raw_tokens']} tokens, normalize changed "
+              f"{tokens['changed_share']:.1%} and emptied {tokens['removed_share']:.1%} "
+              f"({tokens['removed_char_share']:.1%} of characters removed)")
+        for prefix_len, stats in corpus['models'].items():
+            successors, size = stats['successors'], stats['bytes']
+            print(f"  prefix_len={prefix_len}: {stats['prefixes']} prefixes, {stats['vocabulary']} words, "
+                  f"{stats['transitions']} transitions, built in {stats['build_seconds']:.2f}s")
+            print(f"    successors per prefix: mean {successors['mean']:.2f}, p50 {successors['p50']}, "
+                  f"p90 {successors['p90']}, p99 {successors['p99']}, max {successors['max']}; "
+                  f"{successors['deterministic_share']:.0%} deterministic")
+            print(f"    memory {size['total'] / 1e6:.1f} MB: keys {size['keys'] / 1e6:.1f} MB, "
+                  f"lists {size['lists'] / 1e6:.1f} MB, strings {size['strings'] / 1e6:.1f} MB, "
+                  f"table {size['table'] / 1e6:.1f} MB")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(corpora, file, indent=2)
+    return 0
+
+
+def _loadtest(args):
+    from lib import LoadTest
+    configs = [LoadTest.parse_config(config) for config in args.config] or [{}]
+    results = LoadTest.run(configs, args.clients, args.duration, args.max_words, args.think_time)
+    names = [' '.join(f'{key}={value}' for key, value in overrides.items()) or '(defaults)'
+             for overrides, _ in results]
+    width = max(len(name) for name in names + ['config'])
+    print(f"{'config':<{width}} {'req/s':>8} {'ok':>6} {'busy':>6} {'429':>5} {'err':>5} "
+          f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'lag p99':>8} {'lag max':>8}")
+    for name, (_, result) in zip(names, results):
+        latency, lag = result['latency_ms'], result['loop_lag_ms']
+        print(f"{name:<{width}} {result['throughput']:>8.1f} {result['ok']:>6} {result['busy']:>6} "
+              f"{result['rate_limited']:>5} {result['errors']:>5} {latency['p50']:>8.1f} {latency['p90']:>8.1f} "
+              f"{latency['p99']:>8.1f} {lag['p99']:>8.1f} {lag['max']:>8.1f}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump([{'config': overrides, **result} for overrides, result in results], file, indent=2)
+    return 0
+
+
+def _parser():
+    parser = argparse.ArgumentParser(prog='python -m lib', description='Markov chain model tools.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    compile_cmd = commands.add_parser('compile', help='build models from static/ corpora into cache files')
+    compile_cmd.add_argument('--files', help='comma-separated filenames in static/ (default: INPUT_FILENAME)')
+    compile_cmd.add_argument('--prefix-len', type=int, nargs='+', default=[2, 3],
+                             help='prefix lengths to compile (default: 2 3)')
+    default_output = MarkovGenerator.env.get_model_cache_dir(str(ModelCache.DEFAULT_CACHE_DIR))
+    compile_cmd.add_argument('--output', default=default_output,
+                             help='output directory (default: MODEL_CACHE_DIR or cache/)')
+    compile_cmd.add_argument('--memory-budget', type=_size,
+                             help='compile within roughly this much memory, spilling counts to disk (e.g. 256M)')
+    compile_cmd.add_argument('--min-count', type=int, default=MarkovGenerator.env.get_min_count(),
+                             help='drop successors seen fewer times after a prefix (default: MIN_COUNT or 1)')
+    compile_cmd.add_argument('--collapse-chains', action='store_true',
+                             default=MarkovGenerator.env.get_collapse_chains(),
+                             help='merge deterministic singleton chains into runs (default: COLLAPSE_CHAINS)')
+    compile_cmd.add_argument('--max-vocab', type=int, default=MarkovGenerator.env.get_max_vocab(),
+                             help='keep only the most frequent words (default: MAX_VOCAB, no limit)')
+    compile_cmd.set_defaults(handler=_compile)
+
+    for name, handler, help_text, count in (
+            ('generate', _generate, 'sample responses from a model', 1),
+            ('profile', _profile, 'run the generator under cProfile', 100)):
+        cmd = commands.add_parser(name, help=help_text)
+        cmd.add_argument('--files', help='comma-separated filenames in static/ (default: INPUT_FILENAME)')
+        cmd.add_argument('--model', help='compiled model file; skips corpus processing')
+        cmd.add_argument('--prefix-len', type=int, help='prefix length (default: from TEMPERATURE)')
+        cmd.add_argument('--max-words', type=int, help='maximum words per response (default: MAX_WORDS)')
+        cmd.add_argument('-n', '--count', type=int, default=count, help=f'number of responses (default: {count})')
+        cmd.set_defaults(handler=handler)
+        if name == 'generate':
+            cmd.add_argument('--workers', type=int, default=1, help='worker processes (default: 1)')
+        else:
+            cmd.add_argument('--top', type=int, default=20, help='number of functions to print (default: 20)')
+            cmd.add_argument('--sort', default='cumulative', help='pstats sort key (default: cumulative)')
+
+    share_cmd = commands.add_parser('share', help='pack the model for zero-copy sharing between workers')
+    target = share_cmd.add_mutually_exclusive_group(required=True)
+    target.add_argument('--output', help='write a file that workers memory-map')
+    target.add_argument('--name', help='publish a shared memory segment and keep it alive until stopped')
+    share_cmd.add_argument('--files', help='comma-separated filenames in static/ (default: INPUT_FILENAME)')
+    share_cmd.add_argument('--prefix-len', type=int, help='prefix length (default: from TEMPERATURE)')
+    share_cmd.set_defaults(handler=_share)
+
+    stats_cmd = commands.add_parser('stats', help='report model size and shape per corpus and prefix length')
+    stats_cmd.add_argument('--files', help='comma-separated filenames in static/ (default: INPUT_FILENAME)')
+    stats_cmd.add_argument('--prefix-len', type=int, nargs='+', default=[2, 3],
+                           help='prefix lengths to build (default: 2 3)')
+    stats_cmd.add_argument('--json', help='also write the full report to this file')
+    stats_cmd.set_defaults(handler=_stats)
+
+    load_cmd = commands.add_parser('loadtest', help='start the server locally and measure it under concurrent clients')
+    load_cmd.add_argument('--clients', type=int, default=10, help='concurrent clients (default: 10)')
+    load_cmd.add_argument('--duration', type=float, default=10.0, help='seconds of load per configuration (default: 10)')
+    load_cmd.add_argument('--max-words', type=int, help='max_words per request (default: the server\'s MAX_WORDS)')
+    load_cmd.add_argument('--think-time', type=float, default=0.0,
+                          help='seconds each client pauses between requests (default: 0)')
+    load_cmd.add_argument('--config', action='append', default=[],
+                          help='environment overrides as "KEY=VALUE ..."; repeat to compare configurations')
+    load_cmd.add_argument('--json', help='also write the full results to this file')
+    load_cmd.set_defaults(handler=_loadtest)
+
+    return parser
+
+
+def main(argv=None):
+    """
+    Run the command line interface.
+
+    Args:
+        argv: Argument list; defaults to sys.argv[1:]
+
+    Returns:
+        Process exit code
+    """
+    args = _parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except FileNotFoundError as error:
+        print(f'error: {error}', file=sys.stderr)
+        return 1
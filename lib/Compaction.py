@@ -0,0 +1,246 @@
+"""
+Module for pruning and compacting Markov models.
+
+Three passes trade fidelity for footprint:
+
+- max_vocab keeps only the most frequent successor words; prefixes that
+  contain a dropped word are removed.
+- min_count drops successors seen fewer times than the threshold after a
+  prefix (the most frequent one is always kept, so no prefix dead-ends).
+- collapse_chains merges deterministic singleton chains: when a prefix has a
+  single distinct successor and the next prefix can only be reached from it,
+  the next prefix is removed and its words are appended to the first one as
+  a multi-word run ("w1 w2 w3"), which MarkovGenerator._walk emits in one step.
+"""
+import random
+import time
+from collections import Counter
+
+# Longest multi-word run produced by collapse_chains
+MAX_RUN = 32
+
+
+def options(min_count: int = 1, collapse_chains: bool = False, max_vocab: int = None):
+    """
+    Collect the compaction options that differ from a plain build.
+
+    Args:
+        min_count: Minimum successor count kept after a prefix
+        collapse_chains: Merge deterministic singleton chains into runs
+        max_vocab: Keep only this many of the most frequent words
+
+    Returns:
+        Dictionary of enabled options, empty when the model is left untouched
+    """
+    enabled = {}
+    if min_count > 1:
+        enabled['min_count'] = min_count
+    if collapse_chains:
+        enabled['collapse_chains'] = True
+    if max_vocab:
+        enabled['max_vocab'] = max_vocab
+    return enabled
+
+
+def compact(possibles, min_count: int = 1, collapse_chains: bool = False, max_vocab: int = None):
+    """
+    Apply the enabled compaction passes to a model.
+
+    Args:
+        possibles: Dictionary of possible next words
+        min_count: Minimum successor count kept after a prefix
+        collapse_chains: Merge deterministic singleton chains into runs
+        max_vocab: Keep only this many of the most frequent words
+
+    Returns:
+        A new dictionary; the input model is not modified
+    """
+    if max_vocab:
+        possibles = _cap_vocab(possibles, max_vocab)
+    if min_count > 1:
+        possibles = _prune(possibles, min_count)
+    if collapse_chains:
+        possibles = _collapse(possibles)
+    return dict(possibles)
+
+
+def report(before, after, samples: int = 200, max_words: int = 50):
+    """
+    Measure what compaction saved.
+
+    Args:
+        before: Model before compaction
+        after: Model after compaction
+        samples: Number of responses generated to time sampling
+        max_words: Words per timed response
+
+    Returns:
+        Dictionary with prefix counts, approximate bytes and sampling times
+    """
+    bytes_before = model_bytes(before)
+    bytes_after = model_bytes(after)
+    seconds_before = _time_sampling(before, samples, max_words)
+    seconds_after = _time_sampling(after, samples, max_words)
+    return {
+        'prefixes_before': len(before),
+        'prefixes_after': len(after),
+        'bytes_before': bytes_before,
+        'bytes_after': bytes_after,
+        'bytes_saved': bytes_before - bytes_after,
+        'sample_seconds_before': seconds_before,
+        'sample_seconds_after': seconds_after,
+        'speedup': seconds_before / seconds_after if seconds_after else float('inf'),
+    }
+
+
+def model_bytes(possibles) -> int:
+    """
+    Approximate the memory held by a model.
+
+    Counts the dict, every key tuple, every successor list and each distinct
+    string once (strings are shared between keys and lists).
+
+    Args:
+        possibles: Dictionary of possible next words
+
+    Returns:
+        Size in bytes
+    """
+    # Imported here: ModelStats imports MarkovGenerator, which imports this module
+    from lib.ModelStats import memory
+    return memory(possibles)['total']
+
+
+def _time_sampling(possibles, samples: int, max_words: int) -> float:
+    # Imported here: MarkovGenerator imports this module
+    from lib.MarkovGenerator import _generate, _start_candidates
+
+    state = random.getstate()
+    random.seed(0)
+    try:
+        candidates = _start_candidates(possibles)
+        start = time.perf_counter()
+        for _ in range(samples):
+            _generate(possibles, random.choice(candidates), max_words)
+        return time.perf_counter() - start
+    finally:
+        random.setstate(state)
+
+
+def _cap_vocab(possibles, max_vocab: int):
+    """
+    Keep only the max_vocab most frequent words.
+
+    Args:
+        possibles: Dictionary of possible next words
+        max_vocab: Number of words to keep ('' terminators are always kept)
+
+    Returns:
+        Dictionary without out-of-vocabulary prefixes and successors
+    """
+    frequency = Counter()
+    for words in possibles.values():
+        frequency.update(words)
+    frequency.pop('', None)
+    vocab = {word for word, _ in frequency.most_common(max_vocab)}
+    vocab.add('')
+
+    capped = {}
+    for key, words in possibles.items():
+        if not all(word in vocab for word in key):
+            continue
+        capped[key] = [word for word in words if word in vocab] or ['']
+    return capped
+
+
+def _prune(possibles, min_count: int):
+    """
+    Drop successors seen fewer than min_count times after a prefix.
+
+    Args:
+        possibles: Dictionary of possible next words
+        min_count: Minimum count to keep a successor
+
+    Returns:
+        Dictionary with rare successors removed
+    """
+    pruned = {}
+    for key, words in possibles.items():
+        kept = dict(_prune_counts(Counter(words).items(), min_count))
+        pruned[key] = [word for word in words if word in kept]
+    return pruned
+
+
+def _prune_counts(successors, min_count: int):
+    """
+    Drop successors seen fewer than min_count times, keeping at least the most frequent one.
+
+    Args:
+        successors: (successor, count) pairs of one prefix
+        min_count: Minimum count to keep a successor
+
+    Returns:
+        List of the kept (successor, count) pairs
+    """
+    successors = list(successors)
+    kept = [(word, count) for word, count in successors if count >= min_count]
+    return kept or [max(successors, key=lambda item: item[1])]
+
+
+def _collapse(possibles):
+    """
+    Merge deterministic singleton chains into multi-word runs.
+
+    Args:
+        possibles: Dictionary of possible next words
+
+    Returns:
+        Dictionary where absorbed prefixes are removed and their words are
+        appended to the run of the prefix leading into them
+    """
+    single = {key: words[0] for key, words in possibles.items() if len(set(words)) == 1}
+
+    indegree = Counter()
+    predecessor = {}
+    for key, words in possibles.items():
+        for word in set(words):
+            following = _shift(key, word)
+            indegree[following] += 1
+            predecessor[following] = key
+
+    def absorbable(key):
+        # Removable only if the chain passes through it and nothing else leads there
+        return (key in single and indegree[key] == 1
+                and predecessor[key] in single and predecessor[key] != key)
+
+    compacted = {}
+    absorbed = set()
+
+    def emit(head):
+        words = possibles[head]
+        if head not in single:
+            compacted[head] = words
+            return
+        run = [single[head]]
+        seen = {head}
+        current = _shift(head, single[head])
+        while absorbable(current) and current not in seen and len(run) < MAX_RUN:
+            seen.add(current)
+            absorbed.add(current)
+            run.append(single[current])
+            current = _shift(current, single[current])
+        compacted[head] = [' '.join(run)]
+
+    for key in possibles:
+        if not absorbable(key):
+            emit(key)
+
+    # Chains cut at MAX_RUN and pure cycles leave prefixes nobody absorbed
+    for key in possibles:
+        if absorbable(key) and key not in absorbed and key not in compacted:
+            emit(key)
+    return compacted
+
+
+def _shift(key, word):
+    return key[1:] + (word,)
@@ -2,18 +2,29 @@
 Module to load environment variables from a .env file.
 """
 import os
-from typing import List
-from dotenv import load_dotenv
+from typing import List, Optional
 
 class EnvironmentVariables:
     _instance = None
+    _loaded = False
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            load_dotenv()  # Load .env once at initialization
         return cls._instance
 
+    def _load(self):
+        """
+        Load the .env file once, on first access.
+
+        Deferred so that importing modules which hold the singleton stays free of
+        file system work and of the python-dotenv import.
+        """
+        if not self._loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            self._loaded = True
+
     def get_max_words(self, default: int = 50) -> int:
         """
         Get the MAX_WORDS environment variable as an integer.
@@ -24,6 +35,7 @@ class EnvironmentVariables:
         Returns:
             The MAX_WORDS value as an integer
         """
+        self._load()
         value = os.getenv("MAX_WORDS")
         if value is None:
             return default
@@ -39,6 +51,7 @@ class EnvironmentVariables:
         Returns:
             A list of filenames
         """
+        self._load()
         value = os.getenv("INPUT_FILENAME", default)
         if value is None:
             return []
@@ -54,8 +67,265 @@ class EnvironmentVariables:
         Returns:
             The TEMPERATURE value as a float
         """
+        self._load()
         value = os.getenv("TEMPERATURE")
         if value is None:
             return default
         return float(value)
 
+
+    def get_model_cache_dir(self, default: str = None) -> Optional[str]:
+        """
+        Get the MODEL_CACHE_DIR environment variable.
+        
+        Args:
+            default: Default value if the environment variable is not set (default: None)
+            
+        Returns:
+            Directory for compiled model files, or None to keep models in memory only
+        """
+        self._load()
+        value = os.getenv("MODEL_CACHE_DIR", default)
+        if not value:
+            return None
+        return value
+
+    def get_min_count(self, default: int = 1) -> int:
+        """
+        Get the MIN_COUNT environment variable as an integer.
+        
+        Args:
+            default: Default value if the environment variable is not set (default: 1)
+            
+        Returns:
+            Minimum number of times a successor must follow a prefix to be kept
+        """
+        self._load()
+        value = os.getenv("MIN_COUNT")
+        if not value:
+            return default
+        return int(value)
+
+    def get_max_vocab(self, default: int = None) -> Optional[int]:
+        """
+        Get the MAX_VOCAB environment variable as an integer.
+        
+        Args:
+            default: Default value if the environment variable is not set (default: None)
+            
+        Returns:
+            Number of most frequent words kept in the model, or None for no limit
+        """
+        self._load()
+        value = os.getenv("MAX_VOCAB")
+        if not value:
+            return default
+        return int(value)
+
+    def get_collapse_chains(self, default: bool = False) -> bool:
+        """
+        Get the COLLAPSE_CHAINS environment variable as a boolean.
+        
+        Args:
+            default: Default value if the environment variable is not set (default: False)
+            
+        Returns:
+            True if deterministic singleton chains are collapsed into multi-word runs
+        """
+        self._load()
+        value = os.getenv("COLLAPSE_CHAINS")
+        if not value:
+            return default
+        return value.strip().lower() in ("1", "true", "yes", "on")
+
+    def get_shared_model(self, default: str = None) -> Optional[str]:
+        """
+        Get the SHARED_MODEL environment variable.
+        
+        Args:
+            default: Default value if the environment variable is not set (default: None)
+            
+        Returns:
+            "shm:<name>" or a model file path to sample from in place, or None
+        """
+        self._load()
+        value = os.getenv("SHARED_MODEL", default)
+        if not value:
+            return None
+        return value
+
+    def get_batch_window_ms(self, default: float = 10.0) -> float:
+        """
+        Get the BATCH_WINDOW_MS environment variable as a float.
+        
+        Args:
+            default: Default value if the environment variable is not set (default: 10.0)
+            
+        Returns:
+            Milliseconds to collect concurrent requests into one batch (0 disables waiting)
+        """
+        self._load()
+        value = os.getenv("BATCH_WINDOW_MS")
+        if not value:
+            return default
+        return float(value)
+
+    def get_batch_size(self, default: int = 16) -> int:
+        """
+        Get the BATCH_SIZE environment variable as an integer.
+        
+        Args:
+            default: Default value if the environment variable is not set (default: 16)
+            
+        Returns:
+            Number of pending requests that starts a batch immediately
+        """
+        self._load()
+        value = os.getenv("BATCH_SIZE")
+        if not value:
+            return default
+        return int(value)
+
+    def get_max_concurrent(self, default: int = 16) -> int:
+        """
+        Get the MAX_CONCURRENT environment variable as an integer.
+        
+        Args:
+            default: Default value if the environment variable is not set (default: 16)
+            
+        Returns:
+            Number of generation requests allowed to run at the same time
+        """
+        self._load()
+        value = os.getenv("MAX_CONCURRENT")
+        if not value:
+            return default
+        return int(value)
+
+    def get_max_queue(self, default: int = 32) -> int:
+        """
+        Get the MAX_QUEUE environment variable as an integer.
+        
+        Args:
+            default: Default value if the environment variable is not set (default: 32)
+            
+        Returns:
+            Number of requests allowed to wait for a slot before new ones are rejected as busy
+        """
+        self._load()
+        value = os.getenv("MAX_QUEUE")
+        if not value:
+            return default
+        return int(value)
+
+    def get_queue_timeout(self, default: Optional[float] = 30.0) -> Optional[float]:
+        """
+        Get the QUEUE_TIMEOUT environment variable as a float.
+        
+        Args:
+            default: Default value if the environment variable is not set (default: 30.0)
+            
+        Returns:
+            Seconds a queued request waits before it is rejected as busy, or None to wait forever (0)
+        """
+        self._load()
+        value = os.getenv("QUEUE_TIMEOUT")
+        if not value:
+            return default
+        return float(value) or None
+
+    def get_rate_limit(self, default: float = 0.0) -> float:
+        """
+        Get the RATE_LIMIT environment variable as a float.
+        
+        Args:
+            default: Default value if the environment variable is not set (default: 0.0)
+            
+        Returns:
+            Sustained requests per second allowed per client (0 disables rate limiting)
+        """
+        self._load()
+        value = os.getenv("RATE_LIMIT")
+        if not value:
+            return default
+        return float(value)
+
+    def get_rate_burst(self, default: int = 5) -> int:
+        """
+        Get the RATE_BURST environment variable as an integer.
+        
+        Args:
+            default: Default value if the environment variable is not set (default: 5)
+            
+        Returns:
+            Requests a client may send at once before RATE_LIMIT applies
+        """
+        self._load()
+        value = os.getenv("RATE_BURST")
+        if not value:
+            return default
+        return int(value)
+
+    def get_learn_from_chat(self, default: bool = False) -> bool:
+        """
+        Get the LEARN_FROM_CHAT environment variable as a boolean.
+        
+        Args:
+            default: Default value if the environment variable is not set (default: False)
+            
+        Returns:
+            True if chat messages are learned into the live model
+        """
+        self._load()
+        value = os.getenv("LEARN_FROM_CHAT")
+        if not value:
+            return default
+        return value.strip().lower() in ("1", "true", "yes", "on")
+
+    def get_learn_max_prefixes(self, default: int = 10000) -> int:
+        """
+        Get the LEARN_MAX_PREFIXES environment variable as an integer.
+        
+        Args:
+            default: Default value if the environment variable is not set (default: 10000)
+            
+        Returns:
+            Prefixes kept in the learned overlay before the least recently learned is evicted
+        """
+        self._load()
+        value = os.getenv("LEARN_MAX_PREFIXES")
+        if not value:
+            return default
+        return int(value)
+
+    def get_learn_flush_seconds(self, default: float = 300.0) -> float:
+        """
+        Get the LEARN_FLUSH_SECONDS environment variable as a float.
+        
+        Args:
+            default: Default value if the environment variable is not set (default: 300.0)
+            
+        Returns:
+            Seconds between saves of learned text to the model cache (0 saves only at shutdown)
+        """
+        self._load()
+        value = os.getenv("LEARN_FLUSH_SECONDS")
+        if not value:
+            return default
+        return float(value)
+
+    def get_port(self, default: int = 8080) -> int:
+        """
+        Get the PORT environment variable as an integer.
+        
+        Args:
+            default: Default value if the environment variable is not set (default: 8080)
+            
+        Returns:
+            Port the chat server listens on
+        """
+        self._load()
+        value = os.getenv("PORT")
+        if not value:
+            return default
+        return int(value)
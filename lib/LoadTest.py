@@ -0,0 +1,288 @@
+"""
+Module for load testing the chat server on one machine.
+
+Each configuration starts runner.py in a subprocess on a free local port with
+its environment overrides (corpus, MAX_WORDS, TEMPERATURE, ...), waits until
+the model is loaded, then drives N concurrent clients against POST /generate,
+which goes through the same admission control, batching and generator as the
+chat page. Meanwhile a probe client times GET /generate/stats: that request
+does no work, so its latency is the server's event-loop lag. Everything runs
+against localhost, without network access.
+"""
+import asyncio
+import math
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Seconds to wait for a server to load its model and accept requests
+STARTUP_TIMEOUT = 120
+
+# Seconds between event-loop lag probes
+PROBE_INTERVAL = 0.1
+
+# Seconds before a single request counts as an error
+REQUEST_TIMEOUT = 60
+
+
+def parse_config(value: str) -> dict:
+    """
+    Parse a configuration given as space-separated KEY=VALUE pairs.
+
+    Args:
+        value: For example "INPUT_FILENAME=aitw.txt MAX_WORDS=50 TEMPERATURE=0"
+
+    Returns:
+        Dictionary of environment overrides
+
+    Raises:
+        ValueError: If a pair has no '='
+    """
+    overrides = {}
+    for pair in value.split():
+        key, sep, setting = pair.partition('=')
+        if not sep or not key:
+            raise ValueError(f'Expected KEY=VALUE, got {pair!r}')
+        overrides[key] = setting
+    return overrides
+
+
+def free_port() -> int:
+    """
+    Find a free local TCP port.
+
+    Returns:
+        Port number
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def server(overrides=None, port: int = None, timeout: float = STARTUP_TIMEOUT):
+    """
+    Run runner.py in a subprocess for the duration of the block.
+
+    Args:
+        overrides: Environment variables set for the server
+        port: Port to listen on (default: a free one)
+        timeout: Seconds to wait for the server to answer
+
+    Yields:
+        Base URL of the server
+
+    Raises:
+        RuntimeError: If the server exits or does not answer in time
+    """
+    port = port or free_port()
+    env = {**os.environ, **(overrides or {}), 'PORT': str(port)}
+    base_url = f'http://127.0.0.1:{port}'
+    with tempfile.TemporaryFile() as log:
+        # A session of its own, so stopping it also stops NiceGUI's reload worker
+        process = subprocess.Popen([sys.executable, 'runner.py'], cwd=ROOT, env=env,
+                                   stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+        try:
+            _wait_ready(process, base_url, timeout, log)
+            yield base_url
+        finally:
+            _stop(process)
+
+
+async def drive(base_url: str, clients: int = 10, duration: float = 10.0, max_words: int = None,
+                think_time: float = 0.0, transport=None) -> dict:
+    """
+    Send requests from concurrent clients for a fixed time.
+
+    Args:
+        base_url: Server URL
+        clients: Number of concurrent clients, each waiting for its response before the next request
+        duration: Seconds to keep sending
+        max_words: max_words sent with each request (default: the server's MAX_WORDS)
+        think_time: Seconds each client pauses between requests
+        transport: httpx transport, for tests
+
+    Returns:
+        Summary from summarize(), plus the server's /generate/stats after the run
+    """
+    body = {} if max_words is None else {'max_words': max_words}
+    latencies, statuses, lags = [], [], []
+    limits = httpx.Limits(max_connections=clients + 1)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=REQUEST_TIMEOUT, limits=limits,
+                                 transport=transport) as http:
+        start = time.perf_counter()
+        deadline = start + duration
+
+        async def client():
+            while time.perf_counter() < deadline:
+                sent = time.perf_counter()
+                try:
+                    response = await http.post('/generate', json=body)
+                    statuses.append(response.status_code)
+                except httpx.HTTPError:
+                    statuses.append(None)
+                latencies.append(time.perf_counter() - sent)
+                if think_time:
+                    await asyncio.sleep(think_time)
+
+        async def probe():
+            while time.perf_counter() < deadline:
+                sent = time.perf_counter()
+                try:
+                    await http.get('/generate/stats')
+                    lags.append(time.perf_counter() - sent)
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(PROBE_INTERVAL)
+
+        await asyncio.gather(probe(), *(client() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+        try:
+            server_stats = (await http.get('/generate/stats')).json()
+        except (httpx.HTTPError, ValueError):
+            server_stats = None
+
+    results = summarize(latencies, statuses, lags, elapsed)
+    results['server'] = server_stats
+    return results
+
+
+def run(configs, clients: int = 10, duration: float = 10.0, max_words: int = None,
+        think_time: float = 0.0) -> list:
+    """
+    Load test each configuration on a fresh server.
+
+    Args:
+        configs: List of environment override dictionaries
+        clients: Number of concurrent clients
+        duration: Seconds of load per configuration
+        max_words: max_words sent with each request (default: the server's MAX_WORDS)
+        think_time: Seconds each client pauses between requests
+
+    Returns:
+        List of (overrides, results) pairs in configuration order
+    """
+    results = []
+    for overrides in configs:
+        with server(overrides) as base_url:
+            results.append((overrides, asyncio.run(drive(base_url, clients, duration, max_words, think_time))))
+    return results
+
+
+def summarize(latencies, statuses, lags, elapsed: float) -> dict:
+    """
+    Reduce raw measurements to throughput, outcome counts and percentiles.
+
+    Args:
+        latencies: Seconds per request
+        statuses: HTTP status per request, None for connection errors and timeouts
+        lags: Seconds per event-loop probe
+        elapsed: Wall-clock seconds of the run
+
+    Returns:
+        Dictionary with request counts by outcome, throughput (successful requests
+        per second) and latency and loop lag percentiles in milliseconds
+    """
+    ok = sum(1 for status in statuses if status == 200)
+    return {
+        'requests': len(statuses),
+        'ok': ok,
+        'busy': statuses.count(503),
+        'rate_limited': statuses.count(429),
+        'errors': sum(1 for status in statuses if status not in (200, 503, 429)),
+        'seconds': elapsed,
+        'throughput': ok / elapsed if elapsed else 0.0,
+        'latency_ms': _percentiles(latencies),
+        'loop_lag_ms': _percentiles(lags),
+    }
+
+
+def percentile(values, fraction: float) -> float:
+    """
+    Nearest-rank percentile.
+
+    Args:
+        values: Sorted measurements
+        fraction: Percentile as a fraction (0.99 for p99)
+
+    Returns:
+        The measurement at that rank, or 0.0 without measurements
+    """
+    if not values:
+        return 0.0
+    rank = min(len(values), max(1, math.ceil(fraction * len(values))))
+    return values[rank - 1]
+
+
+def _percentiles(seconds) -> dict:
+    """
+    Summarize durations in milliseconds.
+
+    Args:
+        seconds: Durations in seconds
+
+    Returns:
+        Dictionary with p50, p90, p99 and max
+    """
+    values = sorted(value * 1000 for value in seconds)
+    return {
+        'p50': percentile(values, 0.50),
+        'p90': percentile(values, 0.90),
+        'p99': percentile(values, 0.99),
+        'max': values[-1] if values else 0.0,
+    }
+
+
+def _wait_ready(process, base_url: str, timeout: float, log):
+    """
+    Poll the server until it answers.
+
+    Args:
+        process: Server subprocess
+        base_url: Server URL
+        timeout: Seconds to wait
+        log: File receiving the server output, quoted on failure
+
+    Raises:
+        RuntimeError: If the server exits or does not answer in time
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            if httpx.get(f'{base_url}/generate/stats', timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    log.seek(0)
+    output = log.read().decode('utf-8', 'replace')[-2000:]
+    raise RuntimeError(f'Server at {base_url} did not start:\n{output}')
+
+
+def _stop(process):
+    """
+    Stop the server subprocess and its children.
+
+    Args:
+        process: Server subprocess
+    """
+    if process.poll() is None:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
@@ -6,35 +6,207 @@ import textwrap
 from pathlib import Path
 from collections import defaultdict, deque
 
+from lib import Compaction, ModelCache, OnlineModel
 from lib.EnvironmentVariables import EnvironmentVariables
 from lib.StringUtils import normalize, substring
 
 env = EnvironmentVariables()
 
+# Models already loaded in this process, keyed by (prefix_len, corpus paths)
+# or, for shared models, by the SHARED_MODEL location
+_models = {}
 
-def run():
+# Generated text is cut at the first of these sentence delimiters
+DELIMITERS = ';.!'
+
+
+def run(max_words: int = None):
     """
     Run the Markov chain text generator.
     
+    Args:
+        max_words: Maximum number of words; defaults to MAX_WORDS
+        
     Returns:
         Generated text string
     """
+    shared = _shared_model()
+    if shared is not None:
+        return _text(shared.walk(env.get_max_words() if max_words is None else max_words))
     if env.get_temperature() >= 0.5:
-        return _creative()
+        return _creative(max_words)
+    else:
+        return _deterministic(max_words)
+
+
+def run_batch(count: int, max_words: int = None):
+    """
+    Generate several responses from the current model in one call.
+    
+    Start key candidates are collected once for the whole batch instead of
+    once per response.
+    
+    Args:
+        count: Number of responses to generate
+        max_words: Maximum number of words; defaults to MAX_WORDS
+        
+    Returns:
+        List of generated text strings
+    """
+    if max_words is None:
+        max_words = env.get_max_words()
+    shared = _shared_model()
+    if shared is not None:
+        return [_text(shared.walk(max_words)) for _ in range(count)]
+    possibles = _possibles(prefix_len())
+    candidates = _start_candidates(possibles)
+    return [_generate(possibles, random.choice(candidates), max_words) for _ in range(count)]
+
+
+def stream(max_words: int = None):
+    """
+    Generate one response word by word.
+    
+    Stops at the first sentence delimiter, yielding the same text as run().
+    
+    Args:
+        max_words: Maximum number of words; defaults to MAX_WORDS
+        
+    Yields:
+        The words of the response
+    """
+    if max_words is None:
+        max_words = env.get_max_words()
+    shared = _shared_model()
+    if shared is not None:
+        words = shared.walk(max_words)
     else:
-        return _deterministic()
+        possibles = _possibles(prefix_len())
+        words = _walk(possibles, _pick_start_key(possibles), max_words)
+    for word in words:
+        head = substring(word, DELIMITERS)
+        if head:
+            yield head
+        if head != word:
+            return
 
 
-def _file_path():
+def preload():
+    """
+    Load the model for the current TEMPERATURE so the first request does not pay for it.
+    
+    Returns:
+        Number of prefixes in the loaded model
+    """
+    shared = _shared_model()
+    if shared is not None:
+        return len(shared)
+    return len(_possibles(prefix_len()))
+
+
+def learn(text: str):
+    """
+    Learn a chat message into the live model when LEARN_FROM_CHAT is enabled.
+    
+    Only the message's own transitions are touched, so the cost is
+    O(message length). Shared models are read-only and never learn.
+    
+    Args:
+        text: Message to learn from
+        
+    Returns:
+        Number of transitions learned
+    """
+    if not env.get_learn_from_chat() or _shared_model() is not None:
+        return 0
+    return _possibles(prefix_len()).learn(text)
+
+
+def flush():
+    """
+    Save the text learned since the last flush to MODEL_CACHE_DIR.
+    
+    Learned transitions are saved on their own, next to the compiled model
+    and under its fingerprint, so they are loaded again on restart until the
+    corpus or compaction settings change. The compiled model is left as
+    built, and the saved file never holds more than the bounded overlay.
+    
+    Returns:
+        Number of transitions learned since the last flush
+    """
+    cache_dir = env.get_model_cache_dir()
+    if cache_dir is None:
+        return 0
+    saved = 0
+    for key, model in list(_models.items()):
+        if not isinstance(model, OnlineModel.OnlineModel) or not model.pending:
+            continue
+        saved += model.pending
+        prefix_len, file_paths = key
+        fingerprint = ModelCache.fingerprint(list(file_paths), prefix_len, _compaction_options())
+        try:
+            ModelCache.save(model.snapshot(), ModelCache.learned_path(cache_dir, prefix_len), fingerprint)
+        except OSError:
+            # Read-only image: learned text stays in memory only
+            pass
+    return saved
+
+
+def prefix_len():
+    """
+    Get the prefix length selected by the TEMPERATURE setting.
+    
+    Returns:
+        2 for creative mode (temperature >= 0.5), 3 for deterministic mode
+    """
+    return 2 if env.get_temperature() >= 0.5 else 3
+
+
+def build(prefix_len: int, file_paths=None):
+    """
+    Build a model for offline tools (CLI, workers, benchmarks).
+    
+    Args:
+        prefix_len: Length of the prefix (context window)
+        file_paths: Input files; defaults to the INPUT_FILENAME corpora
+        
+    Returns:
+        Dictionary mapping prefix tuples to lists of possible next words
+    """
+    return dict(_build_possibles(prefix_len, file_paths))
+
+
+def sample(possibles, max_words: int = None):
+    """
+    Generate one response from an already built model.
+    
+    Args:
+        possibles: Dictionary of possible next words
+        max_words: Maximum number of words; defaults to MAX_WORDS
+        
+    Returns:
+        Generated text string
+    """
+    if max_words is None:
+        max_words = env.get_max_words()
+    return _generate(possibles, _pick_start_key(possibles), max_words)
+
+
+def _file_path(filenames=None):
     """
     Get the file paths for input text files.
     
+    Args:
+        filenames: Names of files in static/; defaults to INPUT_FILENAME
+        
     Returns:
         List of Path objects for input files
     """
+    if filenames is None:
+        filenames = env.get_input_filename()
     base = Path(__file__).resolve().parent.parent
     paths = []
-    for filename in env.get_input_filename():
+    for filename in filenames:
         paths.append(base / 'static' / filename)
     return paths
 
@@ -58,20 +230,16 @@ def _read_words(file_paths):
                         yield normalized
 
 
-def _build_possibles(prefix_len: int):
+def _check_files(file_paths):
     """
-    Build a dictionary of possible next words for each prefix.
+    Check that the input files are configured and exist.
     
     Args:
-        prefix_len: Length of the prefix (context window)
-        
-    Returns:
-        Dictionary mapping prefix tuples to lists of possible next words
+        file_paths: List of Path objects to check
         
     Raises:
-        FileNotFoundError: If input files are not found
+        FileNotFoundError: If the list is empty or a file is not found
     """
-    file_paths = _file_path()
     if len(file_paths) == 0:
         raise FileNotFoundError(f"File empty")
 
@@ -79,6 +247,25 @@ def _build_possibles(prefix_len: int):
         if not file_path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
 
+
+def _build_possibles(prefix_len: int, file_paths=None):
+    """
+    Build a dictionary of possible next words for each prefix.
+    
+    Args:
+        prefix_len: Length of the prefix (context window)
+        file_paths: Input files; defaults to the INPUT_FILENAME corpora
+        
+    Returns:
+        Dictionary mapping prefix tuples to lists of possible next words
+        
+    Raises:
+        FileNotFoundError: If input files are not found
+    """
+    if file_paths is None:
+        file_paths = _file_path()
+    _check_files(file_paths)
+
     possibles = defaultdict(list)
     dq = deque([''] * prefix_len, maxlen=prefix_len)
     for word in _read_words(file_paths):
@@ -94,6 +281,159 @@ def _build_possibles(prefix_len: int):
     return possibles
 
 
+def _possibles(prefix_len: int):
+    """
+    Get the model for a prefix length, loading it at most once per process.
+    
+    With LEARN_FROM_CHAT enabled the model is wrapped in an OnlineModel
+    overlay that learn() adds to, starting from the text saved by flush().
+    
+    Args:
+        prefix_len: Length of the prefix (context window)
+        
+    Returns:
+        Dictionary mapping prefix tuples to lists of possible next words
+    """
+    file_paths = _file_path()
+    key = (prefix_len, tuple(file_paths))
+    possibles = _models.get(key)
+    if possibles is None:
+        possibles = _load_or_build(prefix_len, file_paths)
+        if env.get_learn_from_chat():
+            possibles = OnlineModel.OnlineModel(possibles, max_prefixes=env.get_learn_max_prefixes())
+            possibles.restore(_load_learned(prefix_len, file_paths))
+        _models[key] = possibles
+    return possibles
+
+
+def _load_learned(prefix_len: int, file_paths):
+    """
+    Load the text flush() saved for a model, if it was learned on the same corpus.
+    
+    Args:
+        prefix_len: Length of the prefix (context window)
+        file_paths: Corpus files the model is built from
+        
+    Returns:
+        Dictionary of learned successor lists, empty when there is none
+    """
+    cache_dir = env.get_model_cache_dir()
+    if cache_dir is None:
+        return {}
+    fingerprint = ModelCache.fingerprint(file_paths, prefix_len, _compaction_options())
+    try:
+        return ModelCache.load(ModelCache.learned_path(cache_dir, prefix_len), fingerprint)
+    except (FileNotFoundError, ModelCache.StaleModelError):
+        return {}
+
+
+def _shared_model():
+    """
+    Get the read-only model configured through SHARED_MODEL, attaching it once.
+    
+    SHARED_MODEL is either "shm:<name>" for a segment published with
+    ``python -m lib share --name`` or the path of a file written with
+    ``python -m lib share --output``. The model must have been packed with
+    the prefix length TEMPERATURE selects and from the INPUT_FILENAME corpora
+    and compaction options this process uses. The corpora are identified by
+    name and never read, so attaching costs the same for any corpus size and
+    works without the corpus files.
+    
+    Returns:
+        SharedModel instance, or None when SHARED_MODEL is not set
+        
+    Raises:
+        ModelCache.StaleModelError: If the model was built with another prefix length, corpora or options
+    """
+    location = env.get_shared_model()
+    if location is None:
+        return None
+    model = _models.get(location)
+    if model is None:
+        from lib.SharedModel import SharedModel
+        if location.startswith('shm:'):
+            model = SharedModel.attach(location[len('shm:'):])
+        else:
+            model = SharedModel.open(location)
+        expected_len = prefix_len()
+        if model.prefix_len != expected_len:
+            model.close()
+            raise ModelCache.StaleModelError(
+                f'Shared model {location} has prefix length {model.prefix_len} but TEMPERATURE selects '
+                f'{expected_len}; run python -m lib share with the same TEMPERATURE')
+        expected = ModelCache.fingerprint(_file_path(), expected_len, _compaction_options(), contents=False)
+        if model.fingerprint != expected:
+            model.close()
+            raise ModelCache.StaleModelError(
+                f'Shared model {location} was built from different corpora or parameters; '
+                f'run python -m lib share again')
+        _models[location] = model
+    return model
+
+
+def _load_or_build(prefix_len: int, file_paths):
+    """
+    Load the compiled model from MODEL_CACHE_DIR, rebuilding it when missing or stale.
+    
+    Args:
+        prefix_len: Length of the prefix (context window)
+        file_paths: Corpus files the model is built from
+        
+    Returns:
+        Dictionary mapping prefix tuples to lists of possible next words
+    """
+    options = _compaction_options()
+    cache_dir = env.get_model_cache_dir()
+    if cache_dir is None:
+        return _compact(_build_possibles(prefix_len=prefix_len, file_paths=file_paths), options)
+
+    _check_files(file_paths)
+    fingerprint = ModelCache.fingerprint(file_paths, prefix_len, options)
+    path = ModelCache.model_path(cache_dir, prefix_len)
+    try:
+        return ModelCache.load(path, fingerprint)
+    except (FileNotFoundError, ModelCache.StaleModelError):
+        pass
+
+    possibles = _compact(_build_possibles(prefix_len=prefix_len, file_paths=file_paths), options)
+    try:
+        ModelCache.save(possibles, path, fingerprint)
+    except OSError:
+        # Read-only image: serve the rebuilt model without persisting it
+        pass
+    return possibles
+
+
+def _compaction_options():
+    """
+    Get the compaction options configured through MIN_COUNT, COLLAPSE_CHAINS and MAX_VOCAB.
+    
+    Returns:
+        Dictionary of enabled options, empty for an uncompacted model
+    """
+    return Compaction.options(
+        min_count=env.get_min_count(),
+        collapse_chains=env.get_collapse_chains(),
+        max_vocab=env.get_max_vocab(),
+    )
+
+
+def _compact(possibles, options):
+    """
+    Apply the enabled compaction options to a freshly built model.
+    
+    Args:
+        possibles: Dictionary of possible next words
+        options: Options from _compaction_options()
+        
+    Returns:
+        The compacted model, or the model itself when no option is enabled
+    """
+    if not options:
+        return possibles
+    return Compaction.compact(possibles, **options)
+
+
 def _pick_start_key(possibles):
     """
     Pick a starting key from the possibles dictionary.
@@ -106,13 +446,26 @@ def _pick_start_key(possibles):
     Returns:
         A tuple representing the starting key
     """
+    return random.choice(_start_candidates(possibles))
+
+
+def _start_candidates(possibles):
+    """
+    Collect the keys _pick_start_key chooses from.
+    
+    Args:
+        possibles: Dictionary of possible next words
+        
+    Returns:
+        List of candidate starting key tuples
+    """
     # Prefer keys whose first element starts with an uppercase letter
     candidates = [k for k in possibles.keys() if k[0] and k[0][0].isupper()]
     if not candidates:
         candidates = [k for k in possibles.keys() if k[0]]
     if not candidates:
         candidates = list(possibles.keys())
-    return random.choice(candidates)
+    return candidates
 
 
 def _generate(possibles, start_key, max_words):
@@ -127,37 +480,82 @@ def _generate(possibles, start_key, max_words):
     Returns:
         Generated text string
     """
+    return _text(_walk(possibles, start_key, max_words))
+
+
+def _text(words):
+    """
+    Join generated words into the response text.
+    
+    Args:
+        words: Iterable of generated words
+        
+    Returns:
+        Wrapped text cut at the first sentence delimiter
+    """
+    return substring(textwrap.fill(' '.join(words)), DELIMITERS)
+
+
+def _walk(possibles, start_key, max_words):
+    """
+    Walk the Markov chain from a starting key.
+    
+    Args:
+        possibles: Dictionary of possible next words
+        start_key: Starting key tuple
+        max_words: Maximum number of words to generate
+        
+    Yields:
+        The words of the starting key, then each generated word
+    """
     key = tuple(start_key)
-    output = list(key)
+    yield from key
 
-    for _ in range(max_words):
+    remaining = max_words
+    while remaining > 0:
         choices = possibles.get(key, [''])
         word = random.choice(choices)
-        output.append(word)
-        key = tuple(list(key[1:]) + [word]) if len(key) > 1 else (word,)
+        if ' ' in word:
+            # Multi-word run from a collapsed singleton chain (see Compaction)
+            words = word.split(' ')
+            yield from words[:remaining]
+            remaining -= len(words)
+            key = (key + tuple(words))[-len(key):]
+        else:
+            yield word
+            remaining -= 1
+            key = tuple(list(key[1:]) + [word]) if len(key) > 1 else (word,)
 
-    return substring(textwrap.fill(' '.join(output)), ';.!')
 
-
-def _deterministic():
+def _deterministic(max_words: int = None):
     """
     Generate text in deterministic mode (larger prefix for more coherent text).
     
+    Args:
+        max_words: Maximum number of words; defaults to MAX_WORDS
+        
     Returns:
         Generated text string
     """
-    possibles = _build_possibles(prefix_len=3)
+    if max_words is None:
+        max_words = env.get_max_words()
+    possibles = _possibles(prefix_len=3)
     start_key = _pick_start_key(possibles)
-    return _generate(possibles, start_key, env.get_max_words())
+    return _generate(possibles, start_key, max_words)
 
 
-def _creative():
+def _creative(max_words: int = None):
     """
     Generate text in creative mode (smaller prefix for more varied text).
     
+    Args:
+        max_words: Maximum number of words; defaults to MAX_WORDS
+        
     Returns:
         Generated text string
     """
-    possibles = _build_possibles(prefix_len=2)
+    if max_words is None:
+        max_words = env.get_max_words()
+    possibles = _possibles(prefix_len=2)
     start_key = _pick_start_key(possibles)
-    return _generate(possibles, start_key, env.get_max_words())
+    return _generate(possibles, start_key, max_words)
@@ -0,0 +1,194 @@
+"""
+Module to persist compiled Markov models to disk.
+
+Each model file stores a fingerprint of the corpus files and build parameters
+it was compiled from, so a stale artifact (corpus edited, different prefix
+length, new format) is detected on load and rebuilt instead of being served.
+
+save() pickles a whole dictionary. save_counts() writes successor counts one
+chunk of prefixes at a time, so a model streamed from StreamingBuilder never
+has to exist in memory to be compiled; load() reads either layout.
+"""
+import hashlib
+import pickle
+import sys
+from itertools import islice
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / 'cache'
+
+# Bump when the pickled layout or the tokenization changes
+FORMAT_VERSION = 1
+
+# Prefixes pickled together by save_counts
+CHUNK_PREFIXES = 256
+
+
+class StaleModelError(ValueError):
+    """Raised when a model file does not match the expected fingerprint."""
+
+
+def model_path(cache_dir, prefix_len: int) -> Path:
+    """
+    Get the cache file path for a model.
+
+    Args:
+        cache_dir: Directory holding compiled models
+        prefix_len: Length of the prefix (context window)
+
+    Returns:
+        Path of the compiled model file
+    """
+    return Path(cache_dir) / f'model_p{prefix_len}.pkl'
+
+
+def learned_path(cache_dir, prefix_len: int) -> Path:
+    """
+    Get the cache file path for text learned on top of a model.
+
+    Args:
+        cache_dir: Directory holding compiled models
+        prefix_len: Length of the prefix (context window)
+
+    Returns:
+        Path of the learned transitions file
+    """
+    return Path(cache_dir) / f'learned_p{prefix_len}.pkl'
+
+
+def fingerprint(file_paths, prefix_len: int, options: dict = None, contents: bool = True) -> str:
+    """
+    Compute the checksum identifying a model build.
+
+    Args:
+        file_paths: Corpus files the model is built from, in order
+        prefix_len: Length of the prefix (context window)
+        options: Extra build parameters, such as compaction options
+        contents: Hash the file contents; False identifies the files by name
+            only, without reading them, so the cost does not grow with the corpora
+
+    Returns:
+        Hex digest over the format version, build parameters and file contents
+
+    Raises:
+        FileNotFoundError: If a corpus file does not exist (only when hashing contents)
+    """
+    digest = hashlib.sha256(f'v{FORMAT_VERSION}:p{prefix_len}{"" if contents else ":names"}'.encode())
+    if options:
+        digest.update(repr(sorted(options.items())).encode())
+    for file_path in file_paths:
+        file_path = Path(file_path)
+        digest.update(b'\0' + file_path.name.encode() + b'\0')
+        if not contents:
+            continue
+        with file_path.open('rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save(possibles, path, fingerprint: str = None) -> Path:
+    """
+    Write a compiled model to disk.
+
+    The file is written next to the destination and renamed into place, so a
+    reader never sees a partially written model.
+
+    Args:
+        possibles: Dictionary of possible next words
+        path: Destination file
+        fingerprint: Build checksum from fingerprint(), stored with the model
+
+    Returns:
+        The destination path
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    with tmp.open('wb') as file:
+        pickle.dump({'fingerprint': fingerprint, 'possibles': dict(possibles)}, file,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    tmp.replace(path)
+    return path
+
+
+def save_counts(counts, path, fingerprint: str = None) -> Path:
+    """
+    Write a model given as successor counts to disk, one chunk at a time.
+
+    Only CHUNK_PREFIXES prefixes are held at once, so the model can be written
+    straight from a stream such as StreamingBuilder.iter_counts().
+
+    Args:
+        counts: Iterable of (prefix tuple, [(successor, count), ...]) pairs
+        path: Destination file
+        fingerprint: Build checksum from fingerprint(), stored with the model
+
+    Returns:
+        The destination path
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    counts = iter(counts)
+    with tmp.open('wb') as file:
+        pickle.dump({'fingerprint': fingerprint, 'counts': True}, file, protocol=pickle.HIGHEST_PROTOCOL)
+        while chunk := list(islice(counts, CHUNK_PREFIXES)):
+            pickle.dump(chunk, file, protocol=pickle.HIGHEST_PROTOCOL)
+        # End marker, so a truncated file is not mistaken for a smaller model
+        pickle.dump(None, file, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp.replace(path)
+    return path
+
+
+def load(path, fingerprint: str = None):
+    """
+    Read a compiled model from disk.
+
+    Args:
+        path: Model file written by save() or save_counts()
+        fingerprint: Expected build checksum; None skips the check
+
+    Returns:
+        Dictionary mapping prefix tuples to lists of possible next words
+
+    Raises:
+        FileNotFoundError: If the model file does not exist
+        StaleModelError: If the stored fingerprint does not match
+    """
+    with Path(path).open('rb') as file:
+        try:
+            data = pickle.load(file)
+            if not isinstance(data, dict) or not ('possibles' in data or 'counts' in data):
+                raise StaleModelError(f'Unknown model format: {path}')
+            if fingerprint is not None and data['fingerprint'] != fingerprint:
+                raise StaleModelError(f'Model {path} was built from different corpora or parameters')
+            if 'possibles' in data:
+                return data['possibles']
+            return _read_counts(file)
+        except (pickle.UnpicklingError, EOFError, AttributeError) as error:
+            raise StaleModelError(f'Unreadable model file {path}: {error}') from error
+
+
+def _read_counts(file):
+    """
+    Read the chunks written by save_counts and expand them into successor lists.
+
+    Args:
+        file: Model file positioned after the header
+
+    Returns:
+        Dictionary mapping prefix tuples to lists of possible next words
+
+    Raises:
+        EOFError: If the file ends before the end marker
+    """
+    possibles = {}
+    while (chunk := pickle.load(file)) is not None:
+        for prefix, successors in chunk:
+            # Chunks are pickled separately, so equal words are only shared once interned
+            words = []
+            for word, count in successors:
+                words.extend([sys.intern(word)] * count)
+            possibles[tuple(sys.intern(word) for word in prefix)] = words
+    return possibles
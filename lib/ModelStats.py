@@ -0,0 +1,200 @@
+"""
+Module for inspecting the size and shape of Markov models.
+
+For each corpus and prefix length it reports the vocabulary, the number of
+prefixes, how many distinct successors prefixes have, the memory held by each
+part of the possibles table and how long the build took, plus how much of the
+corpus normalize() strips. The numbers help pick corpora and prefix lengths
+that fit a memory budget.
+"""
+import sys
+import time
+from collections import Counter
+
+from lib import MarkovGenerator
+from lib.MarkovGenerator import _build_possibles, _check_files
+from lib.StringUtils import normalize
+
+
+def memory(possibles) -> dict:
+    """
+    Approximate the memory held by each part of a model.
+
+    Strings are shared between keys and successor lists, so each distinct
+    string object is counted once.
+
+    Args:
+        possibles: Dictionary of possible next words
+
+    Returns:
+        Bytes held by the dict itself ('table'), the key tuples ('keys'),
+        the successor lists ('lists'), the word strings ('strings') and
+        their sum ('total')
+    """
+    keys = lists = 0
+    strings = {}
+    for key, words in possibles.items():
+        keys += sys.getsizeof(key)
+        lists += sys.getsizeof(words)
+        for word in key:
+            strings[id(word)] = word
+        for word in words:
+            strings[id(word)] = word
+    breakdown = {
+        'table': sys.getsizeof(possibles),
+        'keys': keys,
+        'lists': lists,
+        'strings': sum(sys.getsizeof(word) for word in strings.values()),
+    }
+    breakdown['total'] = sum(breakdown.values())
+    return breakdown
+
+
+def model_stats(possibles) -> dict:
+    """
+    Describe the shape of a model.
+
+    Args:
+        possibles: Dictionary of possible next words (may contain multi-word runs)
+
+    Returns:
+        Dictionary with prefix, transition and vocabulary counts, the
+        distribution of distinct successors per prefix and memory()
+    """
+    vocabulary = set()
+    distinct = []
+    transitions = 0
+    for words in possibles.values():
+        successors = set(words)
+        distinct.append(len(successors))
+        transitions += len(words)
+        for word in successors:
+            vocabulary.update(word.split(' '))
+    vocabulary.discard('')
+    return {
+        'prefix_len': len(next(iter(possibles))) if possibles else 0,
+        'prefixes': len(possibles),
+        'transitions': transitions,
+        'vocabulary': len(vocabulary),
+        'successors': _distribution(distinct),
+        'bytes': memory(possibles),
+    }
+
+
+def token_stats(file_paths) -> dict:
+    """
+    Measure what normalize() strips from a corpus.
+
+    Args:
+        file_paths: List of Path objects to read from
+
+    Returns:
+        Dictionary with raw tokens, tokens normalize() changed or emptied,
+        their shares, and the share of characters removed
+    """
+    raw = changed = emptied = raw_chars = kept_chars = 0
+    for file_path in file_paths:
+        with file_path.open('r', encoding='utf-8') as file:
+            for line in file:
+                for word in line.split():
+                    normalized = normalize(word)
+                    raw += 1
+                    raw_chars += len(word)
+                    kept_chars += len(normalized or '')
+                    if normalized != word:
+                        changed += 1
+                    if not normalized:
+                        emptied += 1
+    return {
+        'raw_tokens': raw,
+        'changed_tokens': changed,
+        'removed_tokens': emptied,
+        'changed_share': changed / raw if raw else 0.0,
+        'removed_share': emptied / raw if raw else 0.0,
+        'removed_char_share': (raw_chars - kept_chars) / raw_chars if raw_chars else 0.0,
+    }
+
+
+def corpus_stats(file_paths, prefix_lens=(2, 3)) -> dict:
+    """
+    Build a corpus at each prefix length and describe the results.
+
+    Args:
+        file_paths: List of Path objects forming one corpus
+        prefix_lens: Prefix lengths to build
+
+    Returns:
+        Dictionary with the corpus file names, token_stats() and, per prefix
+        length, model_stats() plus the build time in seconds
+
+    Raises:
+        FileNotFoundError: If input files are not found
+    """
+    _check_files(file_paths)
+    models = {}
+    for prefix_len in prefix_lens:
+        start = time.perf_counter()
+        possibles = _build_possibles(prefix_len=prefix_len, file_paths=file_paths)
+        build_seconds = time.perf_counter() - start
+        models[prefix_len] = {**model_stats(possibles), 'build_seconds': build_seconds}
+    return {
+        'files': [file_path.name for file_path in file_paths],
+        'tokens': token_stats(file_paths),
+        'models': models,
+    }
+
+
+def report(filenames=None, prefix_lens=(2, 3)) -> list:
+    """
+    Describe each corpus of an INPUT_FILENAME set, and the set combined.
+
+    Args:
+        filenames: Names of files in static/; defaults to INPUT_FILENAME
+        prefix_lens: Prefix lengths to build
+
+    Returns:
+        List of corpus_stats() results: one per file, then the combined set
+        when it has more than one file
+
+    Raises:
+        FileNotFoundError: If input files are not found
+    """
+    file_paths = MarkovGenerator._file_path(filenames)
+    _check_files(file_paths)
+    corpora = [[file_path] for file_path in file_paths]
+    if len(file_paths) > 1:
+        corpora.append(file_paths)
+    return [corpus_stats(corpus, prefix_lens) for corpus in corpora]
+
+
+def _distribution(values) -> dict:
+    """
+    Summarize distinct successor counts.
+
+    Args:
+        values: Distinct successors of each prefix
+
+    Returns:
+        Dictionary with mean, percentiles, max, the share of deterministic
+        prefixes (one successor) and a histogram of counts in power-of-two buckets
+    """
+    if not values:
+        return {'mean': 0.0, 'p50': 0, 'p90': 0, 'p99': 0, 'max': 0, 'deterministic_share': 0.0, 'histogram': {}}
+    ordered = sorted(values)
+
+    def rank(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    buckets = Counter()
+    for value in ordered:
+        upper = 1 << (value - 1).bit_length()
+        buckets[f'{upper // 2 + 1}-{upper}' if upper > 2 else str(value)] += 1
+    return {
+        'mean': sum(ordered) / len(ordered),
+        'p50': rank(0.50),
+        'p90': rank(0.90),
+        'p99': rank(0.99),
+        'max': ordered[-1],
+        'deterministic_share': buckets.get('1', 0) / len(ordered),
+        'histogram': dict(sorted(buckets.items(), key=lambda item: int(item[0].split('-')[-1]))),
+    }
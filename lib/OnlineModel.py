@@ -0,0 +1,187 @@
+"""
+Module for learning from new text on top of a loaded Markov model.
+
+New transitions go into a bounded overlay instead of the model itself, so
+learning a message costs O(message length) and never triggers a rebuild. The
+overlay keeps at most max_prefixes prefixes (least recently learned ones are
+evicted first) and max_successors successors per prefix (oldest dropped
+first). The base model is never modified: snapshot() copies the overlay for
+the caller to save next to the compiled model and restore() loads it back, so
+learned text survives restarts without growing past those bounds.
+
+Sampling sees the base model and the overlay as one model: a prefix's
+successors are its base list followed by its overlay list.
+"""
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from lib.StringUtils import normalize
+
+DEFAULT_MAX_PREFIXES = 10000
+DEFAULT_MAX_SUCCESSORS = 64
+
+
+class _Chain:
+    """Read-only sequence of two lists, so random.choice needs no copy."""
+
+    __slots__ = ('_first', '_second')
+
+    def __init__(self, first, second):
+        self._first = first
+        self._second = second
+
+    def __len__(self):
+        return len(self._first) + len(self._second)
+
+    def __getitem__(self, index):
+        if index < len(self._first):
+            return self._first[index]
+        return self._second[index - len(self._first)]
+
+
+class OnlineModel(Mapping):
+    """
+    Possibles dictionary with a bounded overlay of learned transitions.
+
+    Reads (get, iteration) are safe from generation threads while another
+    thread learns or takes a snapshot.
+    """
+
+    def __init__(self, base, max_prefixes: int = DEFAULT_MAX_PREFIXES,
+                 max_successors: int = DEFAULT_MAX_SUCCESSORS):
+        """
+        Wrap a loaded model.
+
+        Args:
+            base: Dictionary of possible next words, read but never modified
+            max_prefixes: Prefixes kept in the overlay before the oldest is evicted
+            max_successors: Successors kept per overlay prefix
+        """
+        self.base = base
+        self.max_prefixes = max(1, max_prefixes)
+        self.max_successors = max(1, max_successors)
+        self.prefix_len = len(next(iter(base))) if base else 2
+        self._overlay = OrderedDict()
+        self._lock = threading.Lock()
+        self.learned = 0
+        self.evicted = 0
+        # Transitions learned since the last snapshot()
+        self.pending = 0
+
+    def learn(self, text: str) -> int:
+        """
+        Add the transitions of a message to the overlay.
+
+        The message is tokenized like the corpus files and padded with ''
+        on both sides, so it can start and end a generated response.
+
+        Args:
+            text: Message to learn from
+
+        Returns:
+            Number of transitions added
+        """
+        words = [word for word in (normalize(token) for token in text.split()) if word is not None]
+        if not words:
+            return 0
+        key = ('',) * self.prefix_len
+        with self._lock:
+            for word in words + [''] * self.prefix_len:
+                self._add(key, word)
+                key = key[1:] + (word,)
+            self.learned += len(words) + self.prefix_len
+            self.pending += len(words) + self.prefix_len
+        return len(words) + self.prefix_len
+
+    def snapshot(self) -> dict:
+        """
+        Copy the overlay, least recently learned prefix first, and reset pending.
+
+        Returns:
+            Dictionary mapping prefix tuples to learned successor lists
+        """
+        with self._lock:
+            self.pending = 0
+            return {key: list(words) for key, words in self._overlay.items()}
+
+    def restore(self, learned):
+        """
+        Load a snapshot() back into the overlay, within the current bounds.
+
+        Args:
+            learned: Dictionary from snapshot(), least recently learned prefix first
+        """
+        with self._lock:
+            for key, words in learned.items():
+                if len(key) != self.prefix_len:
+                    continue
+                self._overlay.pop(key, None)
+                self._overlay[key] = list(words[-self.max_successors:])
+            while len(self._overlay) > self.max_prefixes:
+                self._overlay.popitem(last=False)
+
+    def stats(self) -> dict:
+        """
+        Get the overlay size and counters.
+
+        Returns:
+            Dictionary with overlay prefixes, learned and unsaved transitions and evictions
+        """
+        return {
+            'overlay_prefixes': len(self._overlay),
+            'max_prefixes': self.max_prefixes,
+            'learned': self.learned,
+            'pending': self.pending,
+            'evicted': self.evicted,
+        }
+
+    def get(self, key, default=None):
+        words = self.base.get(key)
+        learned = self._overlay.get(key)
+        if learned is None:
+            return default if words is None else words
+        if words is None:
+            return learned
+        return _Chain(words, learned)
+
+    def __getitem__(self, key):
+        words = self.get(key)
+        if words is None:
+            raise KeyError(key)
+        return words
+
+    def __contains__(self, key):
+        return key in self.base or key in self._overlay
+
+    def __iter__(self):
+        with self._lock:
+            keys = list(self.base)
+            keys.extend(key for key in self._overlay if key not in self.base)
+        return iter(keys)
+
+    def __len__(self):
+        with self._lock:
+            return len(self.base) + sum(1 for key in self._overlay if key not in self.base)
+
+    def _add(self, key, word):
+        """
+        Record one transition, evicting the least recently learned prefix when full.
+
+        Args:
+            key: Prefix tuple
+            word: Successor word
+        """
+        words = self._overlay.get(key)
+        if words is None:
+            if len(self._overlay) >= self.max_prefixes:
+                self._overlay.popitem(last=False)
+                self.evicted += 1
+            self._overlay[key] = [word]
+            return
+        self._overlay.move_to_end(key)
+        if len(words) < self.max_successors:
+            words.append(word)
+        else:
+            # Replaced rather than trimmed in place, for readers holding the old list
+            self._overlay[key] = words[1:] + [word]
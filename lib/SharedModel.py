@@ -0,0 +1,357 @@
+"""
+Module for an array-backed Markov model that several processes can share.
+
+The model is packed into one flat buffer of uint32 arrays plus a UTF-8 string
+blob. The buffer lives either in a multiprocessing.shared_memory segment or in
+a file mapped with mmap. Other processes attach read-only and sample from it
+in place: there is nothing to unpickle, so attaching costs the same for any
+corpus size and the pages are shared between all workers.
+
+Layout (native byte order):
+
+    header        MAGIC, version, prefix_len, counts, build fingerprint
+    token_offsets n_tokens + 1       start of each token in the blob
+    part_offsets  n_tokens + 1       start of each token's words in parts
+    parts         n_parts            word ids of each token (runs have several)
+    prefixes      n_prefixes * plen  prefix word ids, rows sorted
+    succ_offsets  n_prefixes + 1     start of each prefix's successors
+    successors    n_successors       successor token ids, repeated by count
+    starts        n_starts           prefix rows used as starting keys
+    index         n_slots            open-addressing hash table: prefix row + 1, 0 = empty
+    blob          blob_len bytes     token strings
+
+Token 0 is always the empty terminator ''.
+"""
+import atexit
+import mmap
+import random
+import struct
+from array import array
+from multiprocessing import shared_memory
+from pathlib import Path
+
+from lib.MarkovGenerator import _start_candidates
+
+MAGIC = b'MARKOVSM'
+VERSION = 1
+_HEADER = struct.Struct('=8s9I64s')
+
+
+class _Rows:
+    """Sequence view of the prefix rows as tuples of word ids."""
+
+    def __init__(self, prefixes, prefix_len: int, count: int):
+        self._prefixes = prefixes
+        self._prefix_len = prefix_len
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        start = index * self._prefix_len
+        return tuple(self._prefixes[start:start + self._prefix_len])
+
+
+class SharedModel:
+    """
+    Read-only Markov model backed by shared memory or a memory-mapped file.
+
+    Use publish() or save() to create the buffer from a possibles dictionary,
+    and attach() or open() to use it from other processes.
+    """
+
+    def __init__(self, buffer, owner=None):
+        """
+        Wrap a packed model buffer.
+
+        Args:
+            buffer: Object supporting the buffer protocol (shm.buf, mmap, bytes)
+            owner: SharedMemory or mmap object to close with the model
+        """
+        self._owner = owner
+        self._closed = False
+        self._buffer = memoryview(buffer)
+        magic, version, prefix_len, n_tokens, n_parts, n_prefixes, n_successors, n_starts, n_slots, \
+            blob_len, fingerprint = _HEADER.unpack_from(self._buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a shared Markov model buffer')
+        self.prefix_len = prefix_len
+        self.fingerprint = fingerprint.rstrip(b'\0').decode('ascii') or None
+
+        ints = self._buffer[_HEADER.size:].cast('B')
+        sizes = [n_tokens + 1, n_tokens + 1, n_parts, n_prefixes * prefix_len, n_prefixes + 1,
+                 n_successors, n_starts, n_slots]
+        arrays = []
+        offset = 0
+        for size in sizes:
+            arrays.append(ints[offset:offset + size * 4].cast('I'))
+            offset += size * 4
+        (self._token_offsets, self._part_offsets, self._parts, self._prefixes,
+         self._succ_offsets, self._successors, self._starts, self._index) = arrays
+        self._mask = n_slots - 1
+        self._blob = ints[offset:offset + blob_len]
+        self._rows = _Rows(self._prefixes, prefix_len, n_prefixes)
+
+    # Creating buffers
+
+    @staticmethod
+    def pack(possibles, fingerprint: str = None) -> bytes:
+        """
+        Pack a possibles dictionary into the shared buffer layout.
+
+        Args:
+            possibles: Dictionary of possible next words (may contain runs)
+            fingerprint: Build checksum stored in the header
+
+        Returns:
+            The packed model
+        """
+        if not possibles:
+            raise ValueError('Cannot pack an empty model')
+        prefix_len = len(next(iter(possibles)))
+
+        ids = {'': 0}
+        tokens = ['']
+
+        def token_id(token):
+            if token not in ids:
+                ids[token] = len(tokens)
+                tokens.append(token)
+            return ids[token]
+
+        rows = sorted((tuple(token_id(word) for word in key), key) for key in possibles)
+        successor_ids = [[token_id(word) for word in possibles[key]] for _, key in rows]
+        # Words inside multi-word runs need ids of their own for the next key
+        for token in list(tokens):
+            if ' ' in token:
+                for word in token.split(' '):
+                    token_id(word)
+
+        token_offsets, part_offsets, parts, blob = [0], [0], [], bytearray()
+        for index, token in enumerate(tokens):
+            blob += token.encode('utf-8')
+            token_offsets.append(len(blob))
+            if ' ' in token:
+                parts.extend(ids[word] for word in token.split(' '))
+            else:
+                parts.append(index)
+            part_offsets.append(len(parts))
+
+        prefixes, succ_offsets, successors = [], [0], []
+        for (row, _), succ in zip(rows, successor_ids):
+            prefixes.extend(row)
+            successors.extend(succ)
+            succ_offsets.append(len(successors))
+
+        row_index = {key: index for index, (_, key) in enumerate(rows)}
+        starts = sorted(row_index[key] for key in _start_candidates(possibles))
+
+        # Power of two with a load factor of at most 1/2
+        n_slots = 1 << (2 * len(rows) - 1).bit_length()
+        index = [0] * n_slots
+        for row_number, (row, _) in enumerate(rows):
+            slot = _hash(row) & (n_slots - 1)
+            while index[slot]:
+                slot = (slot + 1) & (n_slots - 1)
+            index[slot] = row_number + 1
+
+        header = _HEADER.pack(MAGIC, VERSION, prefix_len, len(tokens), len(parts), len(rows),
+                              len(successors), len(starts), n_slots, len(blob),
+                              (fingerprint or '').encode('ascii'))
+        arrays = b''.join(memoryview(_uint32(values)).cast('B')
+                          for values in (token_offsets, part_offsets, parts, prefixes,
+                                         succ_offsets, successors, starts, index))
+        return header + arrays + bytes(blob)
+
+    @classmethod
+    def publish(cls, possibles, name: str = None, fingerprint: str = None):
+        """
+        Pack a model into a new shared memory segment.
+
+        The returned model owns the segment: call unlink() when no process
+        needs it any more.
+
+        Args:
+            possibles: Dictionary of possible next words
+            name: Segment name; a random one is chosen when None
+            fingerprint: Build checksum stored in the header
+
+        Returns:
+            SharedModel attached to the new segment (see .name)
+        """
+        data = cls.pack(possibles, fingerprint)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=len(data))
+        shm.buf[:len(data)] = data
+        return cls(shm.buf, owner=shm)
+
+    @classmethod
+    def attach(cls, name: str):
+        """
+        Attach to a segment created by publish() in another process.
+
+        Args:
+            name: Segment name
+
+        Returns:
+            SharedModel reading the segment in place
+        """
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13 always registers the segment with the resource
+            # tracker, which would unlink it when this attaching process exits
+            from multiprocessing import resource_tracker
+            register = resource_tracker.register
+            resource_tracker.register = lambda name, rtype: None
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+        model = cls(shm.buf, owner=shm)
+        # SharedMemory refuses to close while our views exist, including at interpreter exit
+        atexit.register(model.close)
+        return model
+
+    @classmethod
+    def save(cls, possibles, path, fingerprint: str = None) -> Path:
+        """
+        Pack a model into a file that workers can map with open().
+
+        Args:
+            possibles: Dictionary of possible next words
+            path: Destination file
+            fingerprint: Build checksum stored in the header
+
+        Returns:
+            The destination path
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + '.tmp')
+        tmp.write_bytes(cls.pack(possibles, fingerprint))
+        tmp.replace(path)
+        return path
+
+    @classmethod
+    def open(cls, path):
+        """
+        Map a file written by save() read-only.
+
+        Args:
+            path: Model file
+
+        Returns:
+            SharedModel reading the mapped pages in place
+        """
+        with Path(path).open('rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped, owner=mapped)
+
+    @property
+    def name(self):
+        """Shared memory segment name, or None for mapped files."""
+        return getattr(self._owner, 'name', None)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the packed model in bytes."""
+        return self._buffer.nbytes
+
+    def close(self):
+        """Release this process' view of the model."""
+        if self._closed:
+            return
+        self._closed = True
+        for view in (self._token_offsets, self._part_offsets, self._parts, self._prefixes,
+                     self._succ_offsets, self._successors, self._starts, self._index, self._blob):
+            view.release()
+        self._buffer.release()
+        if self._owner is not None:
+            self._owner.close()
+
+    def unlink(self):
+        """Remove the shared memory segment (publisher only)."""
+        if isinstance(self._owner, shared_memory.SharedMemory):
+            self._owner.unlink()
+
+    # Sampling
+
+    def __len__(self):
+        return len(self._rows)
+
+    def walk(self, max_words: int):
+        """
+        Walk the chain from a random starting key, like MarkovGenerator._walk.
+
+        Args:
+            max_words: Maximum number of words to generate
+
+        Yields:
+            The words of the starting key, then each generated word
+        """
+        if len(self._starts):
+            key = self._rows[self._starts[random.randrange(len(self._starts))]]
+        else:
+            key = self._rows[random.randrange(len(self._rows))]
+        for word_id in key:
+            yield self._token(word_id)
+
+        remaining = max_words
+        while remaining > 0:
+            index = self._find(key)
+            if index < 0:
+                token = 0
+            else:
+                start, end = self._succ_offsets[index], self._succ_offsets[index + 1]
+                token = self._successors[random.randrange(start, end)]
+            parts = tuple(self._parts[self._part_offsets[token]:self._part_offsets[token + 1]])
+            for word_id in parts[:remaining]:
+                yield self._token(word_id)
+            remaining -= len(parts)
+            key = (key + parts)[-self.prefix_len:]
+
+    def _find(self, key) -> int:
+        slot = _hash(key) & self._mask
+        while True:
+            row = self._index[slot]
+            if not row:
+                return -1
+            if self._rows[row - 1] == key:
+                return row - 1
+            slot = (slot + 1) & self._mask
+
+    def _token(self, token_id: int) -> str:
+        return str(self._blob[self._token_offsets[token_id]:self._token_offsets[token_id + 1]], 'utf-8')
+
+
+def _hash(key) -> int:
+    """
+    FNV-1a over word ids; must stay identical between pack() and _find().
+
+    Args:
+        key: Tuple of word ids
+
+    Returns:
+        32-bit hash
+    """
+    value = 2166136261
+    for word_id in key:
+        value = ((value ^ word_id) * 16777619) & 0xFFFFFFFF
+    return value
+
+
+def _uint32(values):
+    """
+    Pack integers as a native uint32 array.
+
+    Args:
+        values: List of non-negative integers
+
+    Returns:
+        array of typecode 'I'
+    """
+    packed = array('I', values)
+    if packed.itemsize != 4:
+        raise RuntimeError('uint32 arrays are required')
+    return packed
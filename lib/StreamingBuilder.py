@@ -0,0 +1,242 @@
+"""
+Module for building Markov models from corpora larger than memory.
+
+Transition counts are accumulated in memory until the configured budget is
+reached, then spilled to disk as a sorted run. The runs are merged (k-way,
+in several passes if needed) into one sorted stream of prefixes with their
+successor counts. build_file() writes that stream straight into a compiled
+model file, so memory stays bounded by the budget from corpus to artifact;
+build() expands it into an in-memory transition table instead.
+"""
+import heapq
+import sys
+import tempfile
+from collections import Counter, deque
+from itertools import count as counter, groupby
+from operator import itemgetter
+from pathlib import Path
+
+from lib import ModelCache
+from lib.Compaction import _prune_counts
+from lib.MarkovGenerator import _check_files, _read_words
+
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+
+# Rough in-memory cost of one distinct (prefix, successor) count: the key
+# tuple, its dict slot and the count. Word strings are interned and shared.
+ENTRY_BYTES = 200
+
+# Maximum number of runs merged at once, to stay well below open file limits
+MAX_MERGE_FANIN = 64
+
+# Rough memory held by each run being merged (its read buffers)
+RUN_BUFFER_BYTES = 32 * 1024
+
+
+def build(file_paths, prefix_len: int, memory_budget: int = DEFAULT_MEMORY_BUDGET, tmp_dir=None):
+    """
+    Build a dictionary of possible next words for each prefix with bounded memory.
+
+    The result is equivalent to MarkovGenerator._build_possibles (same keys,
+    same successor multiset), so it can be sampled and cached the same way.
+
+    Args:
+        file_paths: List of Path objects to read from
+        prefix_len: Length of the prefix (context window)
+        memory_budget: Approximate bytes used for counting before spilling to disk
+        tmp_dir: Directory for spill files (default: system temp directory)
+
+    Returns:
+        Dictionary mapping prefix tuples to lists of possible next words
+
+    Raises:
+        FileNotFoundError: If input files are not found
+    """
+    possibles = {}
+    for prefix, successors in iter_counts(file_paths, prefix_len, memory_budget, tmp_dir):
+        words = []
+        for word, count in successors:
+            words.extend([word] * count)
+        possibles[prefix] = words
+    return possibles
+
+
+def build_file(file_paths, prefix_len: int, path, fingerprint: str = None,
+               memory_budget: int = DEFAULT_MEMORY_BUDGET, tmp_dir=None, min_count: int = 1) -> int:
+    """
+    Compile a model file with bounded memory, without holding the transition table.
+
+    The file is written with ModelCache.save_counts as the counts stream in,
+    and loads with ModelCache.load like any other compiled model.
+
+    Args:
+        file_paths: List of Path objects to read from
+        prefix_len: Length of the prefix (context window)
+        path: Destination model file
+        fingerprint: Build checksum from ModelCache.fingerprint, stored with the model
+        memory_budget: Approximate bytes used for counting before spilling to disk
+        tmp_dir: Directory for spill files (default: system temp directory)
+        min_count: Drop successors seen fewer times after a prefix (as Compaction.compact)
+
+    Returns:
+        Number of prefixes written
+
+    Raises:
+        FileNotFoundError: If input files are not found
+    """
+    _check_files(file_paths)
+    prefixes = 0
+
+    def counts():
+        nonlocal prefixes
+        for prefix, successors in iter_counts(file_paths, prefix_len, memory_budget, tmp_dir):
+            if min_count > 1:
+                successors = _prune_counts(successors, min_count)
+            prefixes += 1
+            yield prefix, successors
+
+    ModelCache.save_counts(counts(), path, fingerprint)
+    return prefixes
+
+
+def iter_counts(file_paths, prefix_len: int, memory_budget: int = DEFAULT_MEMORY_BUDGET, tmp_dir=None):
+    """
+    Count transitions with bounded memory and stream them in prefix order.
+
+    Args:
+        file_paths: List of Path objects to read from
+        prefix_len: Length of the prefix (context window)
+        memory_budget: Approximate bytes used for counting before spilling to disk
+        tmp_dir: Directory for spill files (default: system temp directory)
+
+    Yields:
+        (prefix tuple, [(successor, count), ...]) pairs sorted by prefix
+
+    Raises:
+        FileNotFoundError: If input files are not found
+    """
+    _check_files(file_paths)
+    max_entries = max(1, memory_budget // ENTRY_BYTES)
+    # Small budgets merge fewer runs at once so their buffers fit too
+    fanin = max(2, min(MAX_MERGE_FANIN, memory_budget // RUN_BUFFER_BYTES))
+
+    with tempfile.TemporaryDirectory(prefix='markov-build-', dir=tmp_dir) as spill_dir:
+        spill_dir = Path(spill_dir)
+        run_ids = counter()
+        runs = []
+        counts = Counter()
+        for transition in _transitions(file_paths, prefix_len):
+            counts[transition] += 1
+            if len(counts) >= max_entries:
+                runs.append(_spill(counts, spill_dir / f'run{next(run_ids)}'))
+                counts.clear()
+
+        if runs and counts:
+            # Merging streams everything from disk, so the counts need not stay in memory
+            runs.append(_spill(counts, spill_dir / f'run{next(run_ids)}'))
+            counts.clear()
+
+        while len(runs) > fanin:
+            group, runs = runs[:fanin], runs[fanin:]
+            merged = spill_dir / f'run{next(run_ids)}'
+            with merged.open('w', encoding='utf-8') as file:
+                for key, count in _merge(group):
+                    file.write(_format(key, count))
+            for path in group:
+                path.unlink()
+            runs.append(merged)
+
+        streams = [_read_run(path) for path in runs]
+        streams.append(iter(sorted(counts.items())))
+        merged = _sum_counts(heapq.merge(*streams, key=itemgetter(0)))
+        for prefix, group in groupby(merged, key=lambda item: item[0][:-1]):
+            yield prefix, [(key[-1], count) for key, count in group]
+
+
+def _transitions(file_paths, prefix_len: int):
+    """
+    Generate the (prefix..., successor) tuples _build_possibles records.
+
+    Args:
+        file_paths: List of Path objects to read from
+        prefix_len: Length of the prefix (context window)
+
+    Yields:
+        Tuples of prefix_len prefix words followed by the successor word
+    """
+    dq = deque([''] * prefix_len, maxlen=prefix_len)
+    for word in _read_words(file_paths):
+        word = sys.intern(word)
+        yield (*dq, word)
+        dq.append(word)
+
+    # Same tail terminators as _build_possibles
+    tail = list(dq)
+    for _ in range(prefix_len):
+        yield (*tail, '')
+        tail = tail[1:] + ['']
+
+
+def _format(key, count: int) -> str:
+    # Words never contain whitespace (they come from str.split), so tabs are safe separators
+    return '\t'.join(key) + f'\t{count}\n'
+
+
+def _spill(counts, path: Path) -> Path:
+    """
+    Write counts to disk as a sorted run.
+
+    Args:
+        counts: Counter of transition tuples
+        path: Destination file
+
+    Returns:
+        The destination path
+    """
+    with path.open('w', encoding='utf-8') as file:
+        for key, count in sorted(counts.items()):
+            file.write(_format(key, count))
+    return path
+
+
+def _read_run(path: Path):
+    """
+    Read a sorted run written by _spill.
+
+    Args:
+        path: Run file
+
+    Yields:
+        (transition tuple, count) pairs in sorted order
+    """
+    with path.open('r', encoding='utf-8') as file:
+        for line in file:
+            *key, count = line.rstrip('\n').split('\t')
+            yield tuple(sys.intern(word) for word in key), int(count)
+
+
+def _merge(paths):
+    """
+    Merge sorted runs, summing the counts of equal transitions.
+
+    Args:
+        paths: Run files
+
+    Returns:
+        Iterator of (transition tuple, count) pairs in sorted order
+    """
+    return _sum_counts(heapq.merge(*[_read_run(path) for path in paths], key=itemgetter(0)))
+
+
+def _sum_counts(items):
+    """
+    Collapse consecutive equal keys of a sorted stream into one summed count.
+
+    Args:
+        items: Sorted (key, count) pairs
+
+    Yields:
+        (key, total count) pairs
+    """
+    for key, group in groupby(items, key=itemgetter(0)):
+        yield key, sum(count for _, count in group)
@@ -0,0 +1,8 @@
+"""
+Entry point for ``python -m lib``.
+"""
+import sys
+
+from lib.Cli import main
+
+sys.exit(main())
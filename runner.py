@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
+import asyncio
 import random
-from time import sleep
 
-from html_sanitizer import Sanitizer
-from nicegui import ui
-from lib.MarkovGenerator import run as markov_run
+from nicegui import app, run, ui
+from api import router as api_router, admission, scheduler
+from lib.AdmissionControl import Rejected
+from lib.MarkovGenerator import env, flush as markov_flush, learn as markov_learn, preload as markov_preload
+
 
 def root():
     # Add custom terminal-style CSS
@@ -100,11 +102,21 @@ def root():
             spinner = ui.spinner(type='dots', size='lg', color='green')
 
         await ui.run_javascript('window.scrollTo(0, document.body.scrollHeight)')
-        response = markov_run()
-        sleep(random.randint(1, 3))
+        try:
+            # Admitted against the shared limits, batched with other users' requests
+            # and generated off the event loop
+            async with admission.admit(ui.context.client.ip):
+                # No-op unless LEARN_FROM_CHAT is enabled; costs O(message length)
+                markov_learn(question)
+                response = await scheduler.submit()
+            await asyncio.sleep(random.randint(1, 3))
+        except Rejected as error:
+            # Overloaded or rate limited: answer right away instead of queueing
+            response = str(error)
         await ui.run_javascript('window.scrollTo(0, 0)')
         with response_message.clear():
-            ui.html(f'> {response}', sanitize=Sanitizer().sanitize)
+            # Generated text is plain words, so render it as text instead of parsing HTML
+            ui.label(f'> {response}')
             await ui.run_javascript('window.scrollTo(0, document.body.scrollHeight)')
         message_container.remove(spinner)
 
@@ -122,4 +134,24 @@ def root():
             .style('color: #00aa00')
 
 
-ui.run(root, title='Anti Agent Chatbot', favicon='', show_welcome_message=True, reconnect_timeout=60, dark=True)
+# Headless JSON/SSE generation endpoints on the same FastAPI app
+app.include_router(api_router)
+
+# Load (or rebuild, if stale) the compiled model before the first request arrives
+app.on_startup(markov_preload)
+
+
+async def flush_learned():
+    # Periodically save what the model learned from chat next to the compiled model
+    interval = env.get_learn_flush_seconds()
+    while interval > 0:
+        await asyncio.sleep(interval)
+        await run.io_bound(markov_flush)
+
+
+if env.get_learn_from_chat():
+    app.on_startup(flush_learned)
+    app.on_shutdown(markov_flush)
+
+ui.run(root, title='Anti Agent Chatbot', favicon='', show_welcome_message=True, reconnect_timeout=60, dark=True,
+       port=env.get_port())
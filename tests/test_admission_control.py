@@ -0,0 +1,172 @@
+"""
+Unit tests for AdmissionControl module.
+"""
+import asyncio
+import pytest
+
+from lib.AdmissionControl import AdmissionControl, Busy, RateLimited
+
+
+class FakeClock:
+    """Monotonic clock advanced by hand."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestConcurrency:
+    """Test cases for the concurrency limit and the wait queue."""
+
+    def test_admits_up_to_limit_then_queues(self):
+        """Test that requests beyond max_concurrent wait and run in arrival order."""
+        admission = AdmissionControl(max_concurrent=2, max_queue=2)
+        order = []
+
+        async def request(name, release):
+            async with admission.admit():
+                order.append(name)
+                await release.wait()
+
+        async def scenario():
+            release = asyncio.Event()
+            tasks = [asyncio.ensure_future(request(name, release)) for name in 'abcd']
+            await asyncio.sleep(0)
+            stats = admission.stats()
+            release.set()
+            await asyncio.gather(*tasks)
+            return stats
+
+        stats = asyncio.run(scenario())
+        assert stats['active'] == 2
+        assert stats['queued'] == 2
+        assert order == ['a', 'b', 'c', 'd']
+        assert admission.stats()['active'] == 0
+        assert admission.stats()['admitted'] == 4
+
+    def test_full_queue_rejects_immediately(self):
+        """Test that Busy is raised without waiting once the queue is full."""
+        admission = AdmissionControl(max_concurrent=1, max_queue=1)
+
+        async def scenario():
+            await admission.acquire()
+            waiter = asyncio.ensure_future(admission.acquire())
+            await asyncio.sleep(0)
+            with pytest.raises(Busy) as error:
+                await admission.acquire()
+            admission.release()
+            await waiter
+            admission.release()
+            return error.value
+
+        error = asyncio.run(scenario())
+        assert error.retry_after > 0
+        assert admission.stats()['rejected_busy'] == 1
+        assert admission.stats()['active'] == 0
+
+    def test_queue_timeout_raises_busy(self):
+        """Test that a queued request gives up with Busy after queue_timeout."""
+        admission = AdmissionControl(max_concurrent=1, max_queue=5, queue_timeout=0.01)
+
+        async def scenario():
+            await admission.acquire()
+            with pytest.raises(Busy):
+                await admission.acquire()
+            return admission.stats()
+
+        stats = asyncio.run(scenario())
+        assert stats['timed_out'] == 1
+        assert stats['queued'] == 0
+
+    def test_cancelled_waiter_leaves_queue(self):
+        """Test that a cancelled waiter neither holds a slot nor blocks the queue."""
+        admission = AdmissionControl(max_concurrent=1, max_queue=5)
+
+        async def scenario():
+            await admission.acquire()
+            cancelled = asyncio.ensure_future(admission.acquire())
+            kept = asyncio.ensure_future(admission.acquire())
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            await asyncio.sleep(0)
+            admission.release()
+            await kept
+            admission.release()
+
+        asyncio.run(scenario())
+        assert admission.stats()['active'] == 0
+        assert admission.stats()['queued'] == 0
+
+    def test_slot_released_on_error(self):
+        """Test that admit() frees the slot when the block raises."""
+        admission = AdmissionControl(max_concurrent=1, max_queue=0)
+
+        async def scenario():
+            with pytest.raises(ValueError):
+                async with admission.admit():
+                    raise ValueError('boom')
+            async with admission.admit():
+                pass
+
+        asyncio.run(scenario())
+        assert admission.stats()['admitted'] == 2
+
+
+class TestRateLimit:
+    """Test cases for per-client token buckets."""
+
+    def test_burst_then_reject_then_refill(self):
+        """Test that a client gets burst requests, then waits for tokens to refill."""
+        clock = FakeClock()
+        admission = AdmissionControl(rate=1.0, burst=2, clock=clock)
+
+        async def request(client):
+            async with admission.admit(client):
+                pass
+
+        async def scenario():
+            await request('alice')
+            await request('alice')
+            with pytest.raises(RateLimited) as error:
+                await request('alice')
+            # Other clients have buckets of their own
+            await request('bob')
+            clock.now = 1.0
+            await request('alice')
+            return error.value
+
+        error = asyncio.run(scenario())
+        assert error.retry_after == pytest.approx(1.0)
+        assert admission.stats()['rejected_rate'] == 1
+
+    def test_disabled_by_default(self):
+        """Test that without a rate every request is admitted."""
+        admission = AdmissionControl()
+
+        async def scenario():
+            for _ in range(50):
+                async with admission.admit('alice'):
+                    pass
+
+        asyncio.run(scenario())
+        assert admission.stats()['rejected_rate'] == 0
+
+    def test_idle_buckets_are_forgotten(self):
+        """Test that the bucket table stays bounded."""
+        clock = FakeClock()
+        admission = AdmissionControl(rate=1.0, burst=1, clock=clock)
+
+        async def scenario():
+            for client in range(5):
+                await admission.acquire(client)
+                admission.release()
+            clock.now = 10.0
+            await admission.acquire('late')
+            admission.release()
+
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            monkeypatch.setattr('lib.AdmissionControl.MAX_CLIENTS', 3)
+            asyncio.run(scenario())
+        assert list(admission._buckets) == ['late']
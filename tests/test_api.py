@@ -0,0 +1,144 @@
+"""
+Unit tests for the HTTP/JSON generation API.
+"""
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import router
+from lib.AdmissionControl import AdmissionControl
+
+
+@pytest.fixture
+def client():
+    """Serve the router from a bare FastAPI app, without the NiceGUI page."""
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+class TestGenerate:
+    """Test cases for POST /generate."""
+
+    @patch('lib.MarkovGenerator.run_batch')
+    def test_generate_returns_text(self, mock_run_batch, client):
+        """Test that /generate returns the generated text as JSON, through the scheduler."""
+        mock_run_batch.return_value = ['The quick brown fox']
+        response = client.post('/generate', json={'max_words': 5})
+        assert response.status_code == 200
+        assert response.json() == {'text': 'The quick brown fox'}
+        mock_run_batch.assert_called_once_with(1, 5)
+
+    @patch('lib.MarkovGenerator.run_batch')
+    def test_generate_without_body(self, mock_run_batch, client):
+        """Test that /generate falls back to MAX_WORDS without a body."""
+        mock_run_batch.return_value = ['Hello world']
+        response = client.post('/generate')
+        assert response.json() == {'text': 'Hello world'}
+        mock_run_batch.assert_called_once_with(1, None)
+
+    def test_generate_rejects_invalid_max_words(self, client):
+        """Test that /generate validates max_words."""
+        assert client.post('/generate', json={'max_words': 0}).status_code == 422
+
+    @patch('lib.MarkovGenerator.stream')
+    def test_generate_stream(self, mock_stream, client):
+        """Test that /generate streams server-sent events when requested."""
+        mock_stream.return_value = iter(['The', 'quick', 'fox'])
+        admission = AdmissionControl()
+        with patch('api.admission', admission):
+            response = client.post('/generate', json={'max_words': 3, 'stream': True})
+        assert response.headers['content-type'].startswith('text/event-stream')
+        assert response.text == 'data: The\n\ndata: quick\n\ndata: fox\n\nevent: end\ndata: \n\n'
+        mock_stream.assert_called_once_with(3)
+        assert admission.stats()['active'] == 0
+
+
+    @pytest.mark.parametrize('spec_version', ['2.3', '2.4'])
+    @patch('lib.MarkovGenerator.stream')
+    def test_generate_stream_releases_slot_on_disconnect(self, mock_stream, spec_version):
+        """Test that a client gone before the stream starts does not keep its admission slot."""
+        mock_stream.return_value = iter(['The', 'quick', 'fox'])
+        app = FastAPI()
+        app.include_router(router)
+        body = json.dumps({'stream': True}).encode()
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0', 'spec_version': spec_version}, 'http_version': '1.1',
+            'method': 'POST', 'scheme': 'http', 'path': '/generate', 'raw_path': b'/generate',
+            'root_path': '', 'query_string': b'', 'client': ('127.0.0.1', 50000),
+            'server': ('testserver', 80), 'headers': [(b'content-type', b'application/json')],
+        }
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # The connection stays open until the failed send is noticed
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                raise OSError('Connection reset by peer')
+
+        admission = AdmissionControl(max_concurrent=1, max_queue=0)
+        with patch('api.admission', admission):
+            with pytest.raises(Exception):
+                asyncio.run(app(scope, receive, send))
+        assert admission.stats()['active'] == 0
+        mock_stream.assert_not_called()
+
+
+class TestGenerateBatch:
+    """Test cases for POST /generate/batch."""
+
+    @patch('lib.MarkovGenerator.run_batch')
+    def test_generate_batch(self, mock_run_batch, client):
+        """Test that /generate/batch returns one text per requested response."""
+        mock_run_batch.return_value = ['one', 'two', 'three']
+        response = client.post('/generate/batch', json={'count': 3, 'max_words': 10})
+        assert response.json() == {'texts': ['one', 'two', 'three']}
+        mock_run_batch.assert_called_once_with(3, 10)
+
+    @pytest.mark.parametrize('count', [0, 101])
+    def test_generate_batch_rejects_invalid_count(self, count, client):
+        """Test that /generate/batch bounds the batch size."""
+        assert client.post('/generate/batch', json={'count': count}).status_code == 422
+
+
+class TestAdmission:
+    """Test cases for admission control on the generation endpoints."""
+
+    def test_busy_returns_503(self, client):
+        """Test that a full server answers 503 with Retry-After instead of queueing."""
+        admission = AdmissionControl(max_concurrent=1, max_queue=0)
+        admission._active = 1
+        with patch('api.admission', admission):
+            response = client.post('/generate')
+        assert response.status_code == 503
+        assert response.headers['retry-after'] == '1'
+        assert admission.stats()['rejected_busy'] == 1
+
+    @patch('lib.MarkovGenerator.run_batch')
+    def test_rate_limited_returns_429(self, mock_run_batch, client):
+        """Test that a client over its rate limit gets 429."""
+        mock_run_batch.return_value = ['one']
+        with patch('api.admission', AdmissionControl(rate=0.1, burst=1)):
+            assert client.post('/generate/batch').status_code == 200
+            response = client.post('/generate/batch')
+        assert response.status_code == 429
+        assert int(response.headers['retry-after']) >= 1
+
+    @patch('lib.MarkovGenerator.run_batch')
+    def test_stats_reports_counters(self, mock_run_batch, client):
+        """Test that /generate/stats exposes queue depth and admission counters."""
+        mock_run_batch.return_value = ['one']
+        with patch('api.admission', AdmissionControl()):
+            client.post('/generate/batch')
+            stats = client.get('/generate/stats').json()
+        assert stats['admission']['admitted'] == 1
+        assert stats['admission']['active'] == 0
+        assert stats['admission']['queued'] == 0
+        assert 'requests' in stats['batching']
@@ -0,0 +1,80 @@
+"""
+Unit tests for BatchScheduler module.
+"""
+import asyncio
+from unittest.mock import MagicMock
+
+from lib.BatchScheduler import BatchScheduler
+
+
+def _run_batch(count, max_words):
+    return [f'{max_words}-{index}' for index in range(count)]
+
+
+def _gather(scheduler, *max_words):
+    async def submit_all():
+        return await asyncio.gather(*(scheduler.submit(value) for value in max_words))
+    return asyncio.run(submit_all())
+
+
+class TestBatchScheduler:
+    """Test cases for micro-batching."""
+
+    def test_concurrent_requests_share_one_batch(self):
+        """Test that requests arriving within the window run as one batch call."""
+        run_batch = MagicMock(side_effect=_run_batch)
+        scheduler = BatchScheduler(run_batch, window=0.05)
+        assert _gather(scheduler, 5, 5, 5) == ['5-0', '5-1', '5-2']
+        run_batch.assert_called_once_with(3, 5)
+        assert scheduler.stats() == {'requests': 3, 'batches': 1, 'average_batch': 3.0, 'pending': 0}
+
+    def test_full_batch_runs_without_waiting(self):
+        """Test that reaching max_batch starts the batch before the window ends."""
+        run_batch = MagicMock(side_effect=_run_batch)
+        scheduler = BatchScheduler(run_batch, window=60, max_batch=2)
+
+        async def submit_all():
+            return await asyncio.wait_for(asyncio.gather(scheduler.submit(), scheduler.submit()), 5)
+        assert asyncio.run(submit_all()) == ['None-0', 'None-1']
+        run_batch.assert_called_once_with(2, None)
+
+    def test_groups_by_max_words(self):
+        """Test that requests with different lengths are batched separately."""
+        run_batch = MagicMock(side_effect=_run_batch)
+        scheduler = BatchScheduler(run_batch, window=0.05)
+        assert _gather(scheduler, 5, 10, 5) == ['5-0', '10-0', '5-1']
+        assert run_batch.call_count == 2
+        assert scheduler.stats()['batches'] == 2
+
+    def test_zero_window_runs_each_request(self):
+        """Test that a zero window disables waiting for more requests."""
+        run_batch = MagicMock(side_effect=_run_batch)
+        scheduler = BatchScheduler(run_batch, window=0)
+        assert _gather(scheduler, 5, 5) == ['5-0', '5-0']
+        assert run_batch.call_count == 2
+
+    def test_errors_reach_every_request(self):
+        """Test that a failing batch call raises in each waiting request."""
+        scheduler = BatchScheduler(MagicMock(side_effect=FileNotFoundError('File empty')), window=0.01)
+
+        async def submit_all():
+            return await asyncio.gather(scheduler.submit(), scheduler.submit(), return_exceptions=True)
+        results = asyncio.run(submit_all())
+        assert all(isinstance(result, FileNotFoundError) for result in results)
+
+    def test_cancelled_request_does_not_break_batch(self):
+        """Test that a cancelled waiter is skipped when results are delivered."""
+        scheduler = BatchScheduler(MagicMock(side_effect=_run_batch), window=0.05)
+
+        async def submit_all():
+            cancelled = asyncio.ensure_future(scheduler.submit(5))
+            kept = asyncio.ensure_future(scheduler.submit(5))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            return await kept
+        assert asyncio.run(submit_all()) == '5-0'
+
+    def test_stats_before_any_batch(self):
+        """Test that stats work before any request was made."""
+        scheduler = BatchScheduler(_run_batch)
+        assert scheduler.stats()['average_batch'] == 0.0
@@ -0,0 +1,164 @@
+"""
+Unit tests for Cli module.
+"""
+import json
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+
+from lib import Compaction, ModelCache, StreamingBuilder
+from lib.Cli import main, _size
+
+TEST_FILE = Path(__file__).parent / 'test_data' / 'test_input.txt'
+
+
+@pytest.fixture
+def test_files():
+    """Resolve every --files/INPUT_FILENAME lookup to the test corpus."""
+    with patch('lib.MarkovGenerator._file_path', return_value=[TEST_FILE]):
+        yield
+
+
+class TestCompile:
+    """Test cases for the compile subcommand."""
+
+    def test_compile_writes_models(self, tmp_path, test_files, capsys):
+        """Test that compile writes one model file per prefix length."""
+        assert main(['compile', '--output', str(tmp_path), '--prefix-len', '2', '3']) == 0
+        for prefix_len in (2, 3):
+            possibles = ModelCache.load(ModelCache.model_path(tmp_path, prefix_len))
+            assert all(len(key) == prefix_len for key in possibles)
+        assert 'prefixes' in capsys.readouterr().out
+
+    def test_compile_with_memory_budget(self, tmp_path, test_files):
+        """Test that compile streams the model to disk when given a memory budget."""
+        with patch('lib.StreamingBuilder.build_file', wraps=StreamingBuilder.build_file) as mock_build, \
+                patch('lib.MarkovGenerator.build') as mock_in_memory:
+            assert main(['compile', '--output', str(tmp_path), '--prefix-len', '2',
+                         '--memory-budget', '1K', '--min-count', '2']) == 0
+        mock_in_memory.assert_not_called()
+        path = ModelCache.model_path(tmp_path, 2)
+        fingerprint = ModelCache.fingerprint([TEST_FILE], 2, {'min_count': 2})
+        mock_build.assert_called_once_with([TEST_FILE], 2, path, fingerprint, 1 << 10, min_count=2)
+        expected = Compaction.compact(StreamingBuilder.build([TEST_FILE], 2), min_count=2)
+        loaded = ModelCache.load(path, fingerprint)
+        assert {key: sorted(words) for key, words in loaded.items()} == \
+            {key: sorted(words) for key, words in expected.items()}
+
+    def test_compile_with_memory_budget_rejects_global_passes(self, tmp_path, test_files, capsys):
+        """Test that passes needing the whole model are refused with a memory budget."""
+        assert main(['compile', '--output', str(tmp_path), '--memory-budget', '1M', '--collapse-chains']) == 2
+        assert '--collapse-chains' in capsys.readouterr().err
+        assert not ModelCache.model_path(tmp_path, 2).exists()
+
+    def test_compile_with_compaction(self, tmp_path, test_files, capsys):
+        """Test that compile compacts the model and prints the savings."""
+        assert main(['compile', '--output', str(tmp_path), '--prefix-len', '2', '--collapse-chains']) == 0
+        assert 'compaction:' in capsys.readouterr().out
+        fingerprint = ModelCache.fingerprint([TEST_FILE], 2, {'collapse_chains': True})
+        assert ModelCache.load(ModelCache.model_path(tmp_path, 2), fingerprint)
+
+    @pytest.mark.parametrize('value, expected', [('1024', 1024), ('512K', 512 << 10), ('256M', 256 << 20),
+                                                 ('1.5G', 3 << 29), ('2gb', 2 << 30)])
+    def test_size_parses_units(self, value, expected):
+        """Test that _size accepts plain bytes and K/M/G suffixes."""
+        assert _size(value) == expected
+
+    def test_compile_missing_file(self, tmp_path, capsys):
+        """Test that compile reports missing corpora with a non-zero exit code."""
+        assert main(['compile', '--output', str(tmp_path), '--files', 'missing_12345.txt']) == 1
+        assert 'File not found' in capsys.readouterr().err
+
+
+class TestGenerate:
+    """Test cases for the generate subcommand."""
+
+    def test_generate_from_corpus(self, test_files, capsys):
+        """Test that generate prints the requested number of responses."""
+        assert main(['generate', '-n', '3', '--prefix-len', '2', '--max-words', '10']) == 0
+        assert len(capsys.readouterr().out.strip().split('\n\n')) == 3
+
+    def test_generate_from_model(self, tmp_path, capsys):
+        """Test that generate samples from a compiled model file."""
+        path = ModelCache.save({('The', 'quick'): ['brown'], ('quick', 'brown'): ['fox']},
+                               tmp_path / 'model.pkl')
+        assert main(['generate', '--model', str(path), '--max-words', '5']) == 0
+        assert capsys.readouterr().out.startswith('The quick brown fox')
+
+    def test_generate_parallel(self, tmp_path, capsys):
+        """Test that generate fans out to worker processes."""
+        path = ModelCache.save({('The', 'quick'): ['brown'], ('quick', 'brown'): ['fox']},
+                               tmp_path / 'model.pkl')
+        assert main(['generate', '--model', str(path), '-n', '4', '--workers', '2', '--max-words', '5']) == 0
+        assert capsys.readouterr().out.count('The quick brown fox') == 4
+
+
+class TestProfile:
+    """Test cases for the profile subcommand."""
+
+    def test_profile_prints_hot_functions(self, test_files, capsys):
+        """Test that profile prints pstats output for the generator."""
+        assert main(['profile', '-n', '5', '--prefix-len', '2', '--top', '5']) == 0
+        out = capsys.readouterr().out
+        assert 'function calls' in out
+        assert '_generate' in out or 'sample' in out
+
+
+class TestShare:
+    """Test cases for the share subcommand."""
+
+    def test_share_writes_mappable_file(self, tmp_path, test_files, capsys):
+        """Test that share --output writes a model workers can open."""
+        from lib.SharedModel import SharedModel
+        path = tmp_path / 'model.bin'
+        with patch('lib.MarkovGenerator.env.get_model_cache_dir', return_value=None):
+            assert main(['share', '--output', str(path), '--prefix-len', '2']) == 0
+        assert f'SHARED_MODEL={path}' in capsys.readouterr().out
+        model = SharedModel.open(path)
+        assert model.prefix_len == 2
+        assert model.fingerprint == ModelCache.fingerprint([TEST_FILE], 2, contents=False)
+        model.close()
+
+    def test_share_requires_target(self):
+        """Test that share needs either --output or --name."""
+        with pytest.raises(SystemExit):
+            main(['share'])
+
+
+class TestLoadTest:
+    """Test cases for the loadtest subcommand."""
+
+    def test_loadtest_compares_configs(self, tmp_path, capsys):
+        """Test that loadtest runs each --config and prints one row per configuration."""
+        result = {'throughput': 12.5, 'ok': 100, 'busy': 2, 'rate_limited': 0, 'errors': 0,
+                  'latency_ms': {'p50': 5.0, 'p90': 9.0, 'p99': 20.0, 'max': 25.0},
+                  'loop_lag_ms': {'p50': 1.0, 'p90': 1.5, 'p99': 2.0, 'max': 3.0}}
+        configs = [{'TEMPERATURE': '0'}, {'TEMPERATURE': '1', 'MAX_WORDS': '50'}]
+        output = tmp_path / 'results.json'
+        with patch('lib.LoadTest.run', return_value=[(config, result) for config in configs]) as mock_run:
+            assert main(['loadtest', '--clients', '5', '--duration', '2', '--config', 'TEMPERATURE=0',
+                         '--config', 'TEMPERATURE=1 MAX_WORDS=50', '--json', str(output)]) == 0
+        mock_run.assert_called_once_with(configs, 5, 2.0, None, 0.0)
+        out = capsys.readouterr().out
+        assert 'TEMPERATURE=1 MAX_WORDS=50' in out
+        assert '12.5' in out
+        assert len(json.loads(output.read_text())) == 2
+
+
+class TestStats:
+    """Test cases for the stats subcommand."""
+
+    def test_stats_prints_each_prefix_len(self, test_files, tmp_path, capsys):
+        """Test that stats reports tokens, shape and memory per prefix length."""
+        output = tmp_path / 'stats.json'
+        assert main(['stats', '--prefix-len', '2', '3', '--json', str(output)]) == 0
+        out = capsys.readouterr().out
+        assert 'test_input.txt: 29 tokens' in out
+        assert 'prefix_len=2' in out and 'prefix_len=3' in out
+        assert 'keys' in out and 'strings' in out
+        assert json.loads(output.read_text())[0]['models']['2']['prefixes'] > 0
+
+    def test_stats_missing_file(self, capsys):
+        """Test that stats reports missing corpora with a non-zero exit code."""
+        assert main(['stats', '--files', 'missing_12345.txt']) == 1
+        assert 'File not found' in capsys.readouterr().err
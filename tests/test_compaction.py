@@ -0,0 +1,135 @@
+"""
+Unit tests for Compaction module.
+"""
+import pytest
+from pathlib import Path
+
+from lib import Compaction
+from lib.MarkovGenerator import _build_possibles, _walk
+
+TEST_FILE = Path(__file__).parent / 'test_data' / 'test_input.txt'
+
+
+def _expand(compacted, original):
+    """Check that every multi-word run replays the original deterministic chain."""
+    for key, words in compacted.items():
+        if len(words) == 1 and ' ' in words[0]:
+            current = key
+            for word in words[0].split(' '):
+                assert set(original[current]) == {word}
+                current = current[1:] + (word,)
+
+
+class TestOptions:
+    """Test cases for the options function."""
+
+    def test_options_default_is_empty(self):
+        """Test that default settings enable no compaction."""
+        assert Compaction.options() == {}
+        assert Compaction.options(min_count=1, collapse_chains=False, max_vocab=None) == {}
+
+    def test_options_keeps_enabled_only(self):
+        """Test that only non-default options are returned."""
+        assert Compaction.options(min_count=3, max_vocab=100) == {'min_count': 3, 'max_vocab': 100}
+        assert Compaction.options(collapse_chains=True) == {'collapse_chains': True}
+
+
+class TestCompact:
+    """Test cases for the compaction passes."""
+
+    def test_compact_without_options_is_a_copy(self):
+        """Test that compact with no option returns an equal, separate dict."""
+        possibles = {('a',): ['b']}
+        compacted = Compaction.compact(possibles)
+        assert compacted == possibles
+        assert compacted is not possibles
+
+    def test_min_count_drops_rare_successors(self):
+        """Test that successors below the threshold are dropped."""
+        possibles = {('a',): ['b', 'b', 'c'], ('x',): ['y', 'z']}
+        compacted = Compaction.compact(possibles, min_count=2)
+        assert compacted[('a',)] == ['b', 'b']
+        # All below threshold: the most frequent one is kept
+        assert len(compacted[('x',)]) == 1
+
+    def test_max_vocab_removes_rare_words(self):
+        """Test that out-of-vocabulary words are dropped from keys and successors."""
+        possibles = {('a',): ['b', 'b', 'c'], ('b',): ['b', 'a'], ('c',): ['a']}
+        compacted = Compaction.compact(possibles, max_vocab=2)
+        assert ('c',) not in compacted
+        assert compacted[('a',)] == ['b', 'b']
+        # A prefix left without successors ends the response instead
+        assert Compaction.compact({('a',): ['c'], ('b',): ['a', 'a']}, max_vocab=1) == {('a',): ['']}
+
+    def test_collapse_chains_merges_runs(self):
+        """Test that a deterministic chain becomes one multi-word run."""
+        possibles = {
+            ('The', 'quick'): ['brown', 'brown'],
+            ('quick', 'brown'): ['fox'],
+            ('brown', 'fox'): ['jumps', 'runs'],
+        }
+        compacted = Compaction.compact(possibles, collapse_chains=True)
+        assert compacted == {
+            ('The', 'quick'): ['brown fox'],
+            ('brown', 'fox'): ['jumps', 'runs'],
+        }
+
+    def test_collapse_keeps_prefixes_with_several_entries(self):
+        """Test that a prefix reachable from two prefixes is not absorbed."""
+        possibles = {
+            ('a', 'b'): ['c'],
+            ('x', 'b'): ['c'],
+            ('b', 'c'): ['d'],
+        }
+        compacted = Compaction.compact(possibles, collapse_chains=True)
+        assert compacted[('b', 'c')] == ['d']
+
+    def test_collapse_cycle_keeps_one_prefix(self):
+        """Test that a pure deterministic cycle is kept reachable."""
+        possibles = {('a',): ['b'], ('b',): ['c'], ('c',): ['a']}
+        compacted = Compaction.compact(possibles, collapse_chains=True)
+        assert len(compacted) == 1
+        _expand(compacted, possibles)
+
+    def test_collapse_respects_max_run(self, monkeypatch):
+        """Test that long chains are cut into several runs."""
+        monkeypatch.setattr(Compaction, 'MAX_RUN', 2)
+        possibles = {('a',): ['b'], ('b',): ['c'], ('c',): ['d'], ('d',): ['e'], ('e',): ['x', 'y']}
+        compacted = Compaction.compact(possibles, collapse_chains=True)
+        assert compacted[('a',)] == ['b c']
+        assert compacted[('c',)] == ['d e']
+        _expand(compacted, possibles)
+
+    @pytest.mark.parametrize('prefix_len', [1, 2, 3])
+    def test_collapse_on_corpus_replays_chains(self, prefix_len):
+        """Test that collapsed runs on a real corpus match the original transitions."""
+        possibles = _build_possibles(prefix_len=prefix_len, file_paths=[TEST_FILE])
+        compacted = Compaction.compact(possibles, collapse_chains=True)
+        assert len(compacted) < len(possibles)
+        _expand(compacted, possibles)
+
+    def test_walk_emits_runs_word_by_word(self):
+        """Test that generation splits runs and respects max_words."""
+        compacted = {('The', 'quick'): ['brown fox jumps']}
+        assert list(_walk(compacted, ('The', 'quick'), 10))[:5] == ['The', 'quick', 'brown', 'fox', 'jumps']
+        assert list(_walk(compacted, ('The', 'quick'), 2)) == ['The', 'quick', 'brown', 'fox']
+
+
+class TestReport:
+    """Test cases for the report and model_bytes functions."""
+
+    def test_model_bytes_counts_shared_strings_once(self):
+        """Test that repeated strings do not inflate the estimate."""
+        word = 'x' * 1000
+        one = Compaction.model_bytes({('a',): [word]})
+        many = Compaction.model_bytes({('a',): [word] * 3})
+        assert many - one < 1000
+
+    def test_report_measures_savings(self):
+        """Test that report shows fewer prefixes and bytes after collapsing."""
+        possibles = _build_possibles(prefix_len=2, file_paths=[TEST_FILE])
+        compacted = Compaction.compact(possibles, collapse_chains=True)
+        report = Compaction.report(possibles, compacted, samples=5, max_words=10)
+        assert report['prefixes_after'] < report['prefixes_before']
+        assert report['bytes_saved'] > 0
+        assert report['speedup'] > 0
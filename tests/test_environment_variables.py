@@ -123,3 +123,127 @@ class TestEnvironmentVariables:
         """Test get_temperature with zero value."""
         env = EnvironmentVariables()
         assert env.get_temperature() == 0.0
+
+    @patch('dotenv.load_dotenv')
+    def test_dotenv_loaded_lazily_once(self, mock_load_dotenv):
+        """Test that .env is loaded on first getter call, not at construction."""
+        env = EnvironmentVariables()
+        mock_load_dotenv.assert_not_called()
+        env.get_max_words()
+        env.get_temperature()
+        mock_load_dotenv.assert_called_once()
+
+    @patch.dict(os.environ, {"MODEL_CACHE_DIR": "/app/cache"}, clear=False)
+    def test_get_model_cache_dir_from_env(self):
+        """Test get_model_cache_dir returns value from environment variable."""
+        env = EnvironmentVariables()
+        assert env.get_model_cache_dir() == "/app/cache"
+
+    @patch.dict(os.environ, {"MODEL_CACHE_DIR": ""}, clear=False)
+    def test_get_model_cache_dir_empty_disables_cache(self):
+        """Test get_model_cache_dir treats an empty value as disabled."""
+        env = EnvironmentVariables()
+        assert env.get_model_cache_dir() is None
+        assert env.get_model_cache_dir(default="cache") is None
+
+    @patch('os.getenv')
+    def test_get_model_cache_dir_default(self, mock_getenv):
+        """Test get_model_cache_dir returns the default when not set."""
+        mock_getenv.side_effect = lambda key, default=None: default
+        env = EnvironmentVariables()
+        assert env.get_model_cache_dir() is None
+        assert env.get_model_cache_dir(default="cache") == "cache"
+
+    @patch.dict(os.environ, {"MIN_COUNT": "3", "MAX_VOCAB": "5000", "COLLAPSE_CHAINS": "true"}, clear=False)
+    def test_get_compaction_settings_from_env(self):
+        """Test the compaction getters read MIN_COUNT, MAX_VOCAB and COLLAPSE_CHAINS."""
+        env = EnvironmentVariables()
+        assert env.get_min_count() == 3
+        assert env.get_max_vocab() == 5000
+        assert env.get_collapse_chains() is True
+
+    @patch.dict(os.environ, {"MIN_COUNT": "", "MAX_VOCAB": "", "COLLAPSE_CHAINS": "no"}, clear=False)
+    def test_get_compaction_settings_defaults(self):
+        """Test the compaction getters fall back to an uncompacted model."""
+        env = EnvironmentVariables()
+        assert env.get_min_count() == 1
+        assert env.get_max_vocab() is None
+        assert env.get_collapse_chains() is False
+
+    @patch.dict(os.environ, {"SHARED_MODEL": "shm:markov"}, clear=False)
+    def test_get_shared_model_from_env(self):
+        """Test get_shared_model returns value from environment variable."""
+        env = EnvironmentVariables()
+        assert env.get_shared_model() == "shm:markov"
+
+    @patch.dict(os.environ, {"SHARED_MODEL": ""}, clear=False)
+    def test_get_shared_model_empty(self):
+        """Test get_shared_model treats an empty value as unset."""
+        env = EnvironmentVariables()
+        assert env.get_shared_model() is None
+
+    @patch.dict(os.environ, {"BATCH_WINDOW_MS": "2.5", "BATCH_SIZE": "8"}, clear=False)
+    def test_get_batch_settings_from_env(self):
+        """Test the micro-batching settings are parsed from the environment."""
+        env = EnvironmentVariables()
+        assert env.get_batch_window_ms() == 2.5
+        assert env.get_batch_size() == 8
+
+    @patch.dict(os.environ, {"BATCH_WINDOW_MS": "", "BATCH_SIZE": ""}, clear=False)
+    def test_get_batch_settings_defaults(self):
+        """Test the micro-batching settings fall back to their defaults."""
+        env = EnvironmentVariables()
+        assert env.get_batch_window_ms() == 10.0
+        assert env.get_batch_size() == 16
+
+    @patch.dict(os.environ, {"MAX_CONCURRENT": "4", "MAX_QUEUE": "10", "QUEUE_TIMEOUT": "0",
+                             "RATE_LIMIT": "0.5", "RATE_BURST": "3"}, clear=False)
+    def test_get_admission_settings_from_env(self):
+        """Test the admission control settings are parsed from the environment."""
+        env = EnvironmentVariables()
+        assert env.get_max_concurrent() == 4
+        assert env.get_max_queue() == 10
+        assert env.get_queue_timeout() is None
+        assert env.get_rate_limit() == 0.5
+        assert env.get_rate_burst() == 3
+
+    @patch.dict(os.environ, {"MAX_CONCURRENT": "", "MAX_QUEUE": "", "QUEUE_TIMEOUT": "",
+                             "RATE_LIMIT": "", "RATE_BURST": ""}, clear=False)
+    def test_get_admission_settings_defaults(self):
+        """Test the admission control settings fall back to their defaults."""
+        env = EnvironmentVariables()
+        assert env.get_max_concurrent() == 16
+        assert env.get_max_queue() == 32
+        assert env.get_queue_timeout() == 30.0
+        assert env.get_rate_limit() == 0.0
+        assert env.get_rate_burst() == 5
+
+    @patch.dict(os.environ, {"LEARN_FROM_CHAT": "yes", "LEARN_MAX_PREFIXES": "500", "LEARN_FLUSH_SECONDS": "60"},
+                clear=False)
+    def test_get_learning_settings_from_env(self):
+        """Test the online learning settings are parsed from the environment."""
+        env = EnvironmentVariables()
+        assert env.get_learn_from_chat() is True
+        assert env.get_learn_max_prefixes() == 500
+        assert env.get_learn_flush_seconds() == 60.0
+
+    @patch.dict(os.environ, {"LEARN_FROM_CHAT": "", "LEARN_MAX_PREFIXES": "", "LEARN_FLUSH_SECONDS": ""},
+                clear=False)
+    def test_get_learning_settings_defaults(self):
+        """Test online learning is off by default."""
+        env = EnvironmentVariables()
+        assert env.get_learn_from_chat() is False
+        assert env.get_learn_max_prefixes() == 10000
+        assert env.get_learn_flush_seconds() == 300.0
+
+    @patch.dict(os.environ, {"PORT": "9001"}, clear=False)
+    def test_get_port_from_env(self):
+        """Test get_port reads the listening port from the environment."""
+        env = EnvironmentVariables()
+        assert env.get_port() == 9001
+
+    @patch.dict(os.environ, {"PORT": ""}, clear=False)
+    def test_get_port_default(self):
+        """Test get_port defaults to 8080."""
+        env = EnvironmentVariables()
+        assert env.get_port() == 8080
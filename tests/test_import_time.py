@@ -0,0 +1,59 @@
+"""
+Import-time regression tests for the generator core.
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ('nicegui', 'fastapi', 'html_sanitizer', 'lxml', 'dotenv')
+
+
+def _imported_modules(statement: str):
+    """
+    Run a statement in a fresh interpreter with -X importtime.
+
+    Args:
+        statement: Python code to execute
+
+    Returns:
+        Set of top-level package names imported by the statement
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        name = line.rsplit('|', 1)[1].strip()
+        modules.add(name.split('.')[0])
+    return modules
+
+
+class TestImportTime:
+    """Test cases for the import cost of the lib package."""
+
+    @pytest.mark.parametrize('module', [
+        'lib.MarkovGenerator',
+        'lib.EnvironmentVariables',
+        'lib.StringUtils',
+    ])
+    def test_core_does_not_import_heavy_modules(self, module):
+        """Test that importing the generator core pulls in no web or dotenv packages."""
+        modules = _imported_modules(f'import {module}')
+        assert 'lib' in modules
+        for heavy in HEAVY_MODULES:
+            assert heavy not in modules
+
+    def test_import_does_not_load_dotenv(self):
+        """Test that importing MarkovGenerator does not read the .env file."""
+        result = subprocess.run(
+            [sys.executable, '-c', 'import lib.MarkovGenerator as m; print(m.env._loaded)'],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        assert result.stdout.strip() == 'False'
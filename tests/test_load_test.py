@@ -0,0 +1,80 @@
+"""
+Unit tests for LoadTest module.
+"""
+import asyncio
+import httpx
+import pytest
+
+from lib.LoadTest import drive, parse_config, percentile, summarize
+
+
+class TestParseConfig:
+    """Test cases for parse_config."""
+
+    def test_parses_pairs(self):
+        """Test that space-separated KEY=VALUE pairs become environment overrides."""
+        assert parse_config('INPUT_FILENAME=aitw.txt,brunori.txt MAX_WORDS=50') == {
+            'INPUT_FILENAME': 'aitw.txt,brunori.txt', 'MAX_WORDS': '50'}
+
+    def test_empty_value_allowed(self):
+        """Test that KEY= sets an empty value."""
+        assert parse_config('MODEL_CACHE_DIR=') == {'MODEL_CACHE_DIR': ''}
+
+    def test_rejects_missing_equals(self):
+        """Test that a pair without '=' is an error."""
+        with pytest.raises(ValueError):
+            parse_config('TEMPERATURE')
+
+
+class TestSummarize:
+    """Test cases for percentile and summarize."""
+
+    @pytest.mark.parametrize('fraction, expected', [(0.5, 50), (0.9, 90), (0.99, 99), (1.0, 100), (0.0, 1)])
+    def test_nearest_rank(self, fraction, expected):
+        """Test nearest-rank percentiles over 1..100."""
+        assert percentile(list(range(1, 101)), fraction) == expected
+
+    def test_percentile_without_values(self):
+        """Test that an empty run reports zero."""
+        assert percentile([], 0.99) == 0.0
+
+    def test_counts_outcomes(self):
+        """Test that statuses are split into ok, busy, rate limited and errors."""
+        summary = summarize([0.01, 0.02, 0.03, 0.04, 0.05], [200, 200, 503, 429, None], [0.001], 2.0)
+        assert summary['requests'] == 5
+        assert (summary['ok'], summary['busy'], summary['rate_limited'], summary['errors']) == (2, 1, 1, 1)
+        assert summary['throughput'] == 1.0
+        assert summary['latency_ms']['p50'] == pytest.approx(30.0)
+        assert summary['latency_ms']['max'] == pytest.approx(50.0)
+        assert summary['loop_lag_ms']['p99'] == pytest.approx(1.0)
+
+
+class TestDrive:
+    """Test cases for driving clients against a server."""
+
+    def test_drive_records_every_request(self):
+        """Test that drive sends requests from every client and collects server stats."""
+        bodies = []
+
+        def handler(request):
+            if request.url.path == '/generate/stats':
+                return httpx.Response(200, json={'admission': {'admitted': len(bodies)}})
+            bodies.append(request.content)
+            return httpx.Response(200 if len(bodies) % 2 else 503, json={'text': 'hi'})
+
+        results = asyncio.run(drive('http://test', clients=3, duration=0.05, max_words=7,
+                                    transport=httpx.MockTransport(handler)))
+        assert results['requests'] == len(bodies) > 0
+        assert results['ok'] + results['busy'] == results['requests']
+        assert all(body == b'{"max_words":7}' for body in bodies)
+        assert results['server'] == {'admission': {'admitted': len(bodies)}}
+
+    def test_drive_counts_connection_errors(self):
+        """Test that failed connections are counted as errors instead of aborting the run."""
+        def handler(request):
+            raise httpx.ConnectError('refused', request=request)
+
+        results = asyncio.run(drive('http://test', clients=2, duration=0.02,
+                                    transport=httpx.MockTransport(handler)))
+        assert results['errors'] == results['requests'] > 0
+        assert results['server'] is None
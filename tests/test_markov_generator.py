@@ -9,9 +9,20 @@ from collections import defaultdict
 
 from lib import MarkovGenerator
 from lib.MarkovGenerator import (
-    run, _file_path, _read_words, _build_possibles,
-    _pick_start_key, _generate, _creative, _deterministic
+    run, run_batch, stream, preload, prefix_len, build, sample, _file_path, _read_words, _build_possibles,
+    _possibles, _load_or_build, _pick_start_key, _start_candidates, _generate, _walk, _creative, _deterministic
 )
+from lib import ModelCache
+
+TEST_FILE = Path(__file__).parent / 'test_data' / 'test_input.txt'
+
+
+@pytest.fixture(autouse=True)
+def reset_models():
+    """Drop models loaded by previous tests."""
+    MarkovGenerator._models.clear()
+    yield
+    MarkovGenerator._models.clear()
 
 
 class TestFilePath:
@@ -43,6 +54,13 @@ class TestFilePath:
         paths = _file_path()
         assert len(paths) == 0
 
+    @patch('lib.MarkovGenerator.env.get_input_filename')
+    def test_file_path_explicit_filenames(self, mock_get_input_filename):
+        """Test _file_path with explicit filenames ignores INPUT_FILENAME."""
+        paths = _file_path(['a.txt'])
+        assert [p.name for p in paths] == ['a.txt']
+        mock_get_input_filename.assert_not_called()
+
 
 class TestReadWords:
     """Test cases for the _read_words function."""
@@ -139,6 +157,258 @@ class TestBuildPossibles:
             _build_possibles(prefix_len=2)
 
 
+    def test_build_possibles_explicit_file_paths(self):
+        """Test _build_possibles with explicit file paths."""
+        test_file = Path(__file__).parent / 'test_data' / 'test_input.txt'
+        possibles = _build_possibles(prefix_len=2, file_paths=[test_file])
+        assert ('The', 'quick') in possibles
+
+
+class TestPublicApi:
+    """Test cases for build, sample and prefix_len."""
+
+    def test_build_returns_plain_dict(self):
+        """Test that build returns a plain dict, not a defaultdict."""
+        test_file = Path(__file__).parent / 'test_data' / 'test_input.txt'
+        possibles = build(2, [test_file])
+        assert type(possibles) is dict
+        assert possibles == _build_possibles(prefix_len=2, file_paths=[test_file])
+
+    def test_sample_uses_given_max_words(self):
+        """Test that sample generates from an existing model."""
+        possibles = {('The', 'quick'): ['brown'], ('quick', 'brown'): ['fox']}
+        assert sample(possibles, max_words=2) == 'The quick brown fox'
+
+    @patch('lib.MarkovGenerator.env.get_max_words')
+    def test_sample_defaults_to_max_words(self, mock_max_words):
+        """Test that sample falls back to MAX_WORDS."""
+        mock_max_words.return_value = 1
+        possibles = {('The', 'quick'): ['brown'], ('quick', 'brown'): ['fox']}
+        assert sample(possibles) == 'The quick brown'
+
+    @pytest.mark.parametrize('temperature, expected', [(1.0, 2), (0.5, 2), (0.3, 3)])
+    @patch('lib.MarkovGenerator.env.get_temperature')
+    def test_prefix_len_follows_temperature(self, mock_temp, temperature, expected):
+        """Test that prefix_len maps TEMPERATURE to the prefix length."""
+        mock_temp.return_value = temperature
+        assert prefix_len() == expected
+
+
+class TestBatchAndStream:
+    """Test cases for run_batch and stream."""
+
+    CHAIN = {
+        ('The', 'quick'): ['brown'],
+        ('quick', 'brown'): ['fox.'],
+        ('brown', 'fox.'): ['jumps'],
+    }
+
+    @patch('lib.MarkovGenerator._possibles')
+    @patch('lib.MarkovGenerator.env.get_temperature')
+    def test_run_batch_returns_count_responses(self, mock_temp, mock_possibles):
+        """Test that run_batch generates the requested number of responses."""
+        mock_temp.return_value = 1.0
+        mock_possibles.return_value = self.CHAIN
+        assert run_batch(3, max_words=5) == ['The quick brown fox'] * 3
+        mock_possibles.assert_called_once_with(2)
+
+    @patch('lib.MarkovGenerator._possibles')
+    @patch('lib.MarkovGenerator.env.get_temperature')
+    @patch('lib.MarkovGenerator.env.get_max_words')
+    def test_stream_matches_run(self, mock_max_words, mock_temp, mock_possibles):
+        """Test that stream yields the words of the response and stops at a delimiter."""
+        mock_max_words.return_value = 5
+        mock_temp.return_value = 1.0
+        mock_possibles.return_value = self.CHAIN
+        assert list(stream()) == ['The', 'quick', 'brown', 'fox']
+        assert ' '.join(stream()) == run()
+
+    def test_walk_yields_key_then_words(self):
+        """Test that _walk yields the start key followed by max_words words."""
+        words = list(_walk(self.CHAIN, ('The', 'quick'), 4))
+        assert words == ['The', 'quick', 'brown', 'fox.', 'jumps', '']
+
+    def test_start_candidates_prefers_uppercase(self):
+        """Test that _start_candidates keeps only uppercase keys when available."""
+        assert _start_candidates({('The', 'a'): ['b'], ('a', 'b'): ['c']}) == [('The', 'a')]
+
+    @patch('lib.MarkovGenerator._possibles')
+    @patch('lib.MarkovGenerator.env.get_temperature')
+    def test_run_passes_max_words(self, mock_temp, mock_possibles):
+        """Test that run honours an explicit max_words."""
+        mock_temp.return_value = 0.0
+        mock_possibles.return_value = {('The', 'quick', 'brown'): ['fox'], ('quick', 'brown', 'fox'): ['jumps']}
+        assert run(max_words=1) == 'The quick brown fox'
+
+
+class TestSharedModel:
+    """Test cases for sampling from SHARED_MODEL."""
+
+    @pytest.fixture
+    def shared_path(self, tmp_path):
+        from lib.SharedModel import SharedModel
+        possibles = _build_possibles(prefix_len=2, file_paths=[TEST_FILE])
+        fingerprint = ModelCache.fingerprint([TEST_FILE], 2, MarkovGenerator._compaction_options(), contents=False)
+        path = SharedModel.save(possibles, tmp_path / 'model.bin', fingerprint)
+        with patch('lib.MarkovGenerator.env.get_shared_model', return_value=str(path)), \
+                patch('lib.MarkovGenerator.env.get_temperature', return_value=1.0), \
+                patch('lib.MarkovGenerator._file_path', return_value=[TEST_FILE]):
+            yield path
+        for model in MarkovGenerator._models.values():
+            model.close()
+
+    @patch('lib.MarkovGenerator._possibles')
+    def test_run_uses_shared_model(self, mock_possibles, shared_path):
+        """Test that run, run_batch, stream and preload sample from the shared model."""
+        assert isinstance(run(max_words=5), str)
+        assert len(run_batch(3, max_words=5)) == 3
+        assert 0 < len(list(stream(max_words=5))) <= 7
+        assert preload() > 0
+        mock_possibles.assert_not_called()
+
+    def test_shared_model_attached_once(self, shared_path):
+        """Test that the shared model is opened once per process."""
+        first = MarkovGenerator._shared_model()
+        assert MarkovGenerator._shared_model() is first
+
+    @patch('lib.ModelCache.fingerprint', return_value='abc')
+    @patch('lib.MarkovGenerator.env.get_temperature', return_value=1.0)
+    @patch('lib.SharedModel.SharedModel.attach')
+    @patch('lib.MarkovGenerator.env.get_shared_model')
+    def test_shared_model_segment_name(self, mock_shared, mock_attach, mock_temperature, mock_fingerprint):
+        """Test that shm: locations attach to a shared memory segment."""
+        mock_shared.return_value = 'shm:markov'
+        mock_attach.return_value.prefix_len = 2
+        mock_attach.return_value.fingerprint = 'abc'
+        assert MarkovGenerator._shared_model() is mock_attach.return_value
+        mock_attach.assert_called_once_with('markov')
+
+    def test_shared_model_fingerprint_mismatch(self, shared_path, tmp_path):
+        """Test that a model packed from other corpora is refused instead of served."""
+        other = tmp_path / 'other.txt'
+        other.write_text('Something else entirely.')
+        with patch('lib.MarkovGenerator._file_path', return_value=[other]):
+            with pytest.raises(ModelCache.StaleModelError, match='share'):
+                MarkovGenerator._shared_model()
+        assert not MarkovGenerator._models
+
+    def test_shared_model_attach_does_not_read_corpora(self, shared_path, tmp_path):
+        """Test that a worker checks the model without the corpus files on disk."""
+        missing = tmp_path / 'elsewhere' / TEST_FILE.name
+        with patch('lib.MarkovGenerator._file_path', return_value=[missing]):
+            model = MarkovGenerator._shared_model()
+        assert model.prefix_len == 2
+
+    def test_shared_model_prefix_len_mismatch(self, tmp_path):
+        """Test that a p3 model packed with TEMPERATURE=0 is refused by a TEMPERATURE=1 worker."""
+        from lib.SharedModel import SharedModel
+        possibles = _build_possibles(prefix_len=3, file_paths=[TEST_FILE])
+        fingerprint = ModelCache.fingerprint([TEST_FILE], 3, MarkovGenerator._compaction_options(), contents=False)
+        path = SharedModel.save(possibles, tmp_path / 'model.bin', fingerprint)
+        with patch('lib.MarkovGenerator.env.get_shared_model', return_value=str(path)), \
+                patch('lib.MarkovGenerator.env.get_temperature', return_value=1.0), \
+                patch('lib.MarkovGenerator._file_path', return_value=[TEST_FILE]):
+            with pytest.raises(ModelCache.StaleModelError, match='TEMPERATURE'):
+                run(max_words=5)
+        assert not MarkovGenerator._models
+
+
+class TestModelLoading:
+    """Test cases for _possibles, _load_or_build and preload."""
+
+    @patch('lib.MarkovGenerator._file_path')
+    @patch('lib.MarkovGenerator._build_possibles')
+    def test_possibles_loads_once(self, mock_build_possibles, mock_file_path):
+        """Test that _possibles builds a model once and then reuses it."""
+        mock_file_path.return_value = [TEST_FILE]
+        mock_build_possibles.return_value = {('The', 'quick'): ['brown']}
+        with patch('lib.MarkovGenerator.env.get_model_cache_dir', return_value=None):
+            first = _possibles(prefix_len=2)
+            second = _possibles(prefix_len=2)
+        assert first is second
+        mock_build_possibles.assert_called_once_with(prefix_len=2, file_paths=[TEST_FILE])
+
+    @patch('lib.MarkovGenerator._file_path')
+    @patch('lib.MarkovGenerator.env.get_model_cache_dir')
+    def test_load_or_build_writes_cache(self, mock_cache_dir, mock_file_path, tmp_path):
+        """Test that a missing artifact is built and written with its fingerprint."""
+        mock_cache_dir.return_value = str(tmp_path)
+        mock_file_path.return_value = [TEST_FILE]
+        possibles = _load_or_build(2, [TEST_FILE])
+        fingerprint = ModelCache.fingerprint([TEST_FILE], 2)
+        assert ModelCache.load(ModelCache.model_path(tmp_path, 2), fingerprint) == dict(possibles)
+
+    @patch('lib.MarkovGenerator._build_possibles')
+    @patch('lib.MarkovGenerator.env.get_model_cache_dir')
+    def test_load_or_build_uses_fresh_cache(self, mock_cache_dir, mock_build_possibles, tmp_path):
+        """Test that a matching artifact is loaded without touching the corpus builder."""
+        mock_cache_dir.return_value = str(tmp_path)
+        cached = {('The', 'quick'): ['cached']}
+        ModelCache.save(cached, ModelCache.model_path(tmp_path, 2), ModelCache.fingerprint([TEST_FILE], 2))
+        assert _load_or_build(2, [TEST_FILE]) == cached
+        mock_build_possibles.assert_not_called()
+
+    @patch('lib.MarkovGenerator._file_path')
+    @patch('lib.MarkovGenerator.env.get_model_cache_dir')
+    def test_load_or_build_rebuilds_stale_cache(self, mock_cache_dir, mock_file_path, tmp_path):
+        """Test that an artifact with another fingerprint is rebuilt and replaced."""
+        mock_cache_dir.return_value = str(tmp_path)
+        mock_file_path.return_value = [TEST_FILE]
+        path = ModelCache.model_path(tmp_path, 2)
+        ModelCache.save({('The', 'quick'): ['stale']}, path, 'old-fingerprint')
+        possibles = _load_or_build(2, [TEST_FILE])
+        assert possibles[('The', 'quick')] == ['brown']
+        assert ModelCache.load(path, ModelCache.fingerprint([TEST_FILE], 2)) == dict(possibles)
+
+    @patch('lib.MarkovGenerator._file_path')
+    @patch('lib.MarkovGenerator.env.get_model_cache_dir')
+    @patch('lib.ModelCache.save')
+    def test_load_or_build_read_only_cache(self, mock_save, mock_cache_dir, mock_file_path, tmp_path):
+        """Test that a cache directory that cannot be written still serves the model."""
+        mock_cache_dir.return_value = str(tmp_path)
+        mock_file_path.return_value = [TEST_FILE]
+        mock_save.side_effect = PermissionError('read-only')
+        assert ('The', 'quick') in _load_or_build(2, [TEST_FILE])
+
+    @patch('lib.MarkovGenerator.env.get_model_cache_dir')
+    def test_load_or_build_missing_corpus(self, mock_cache_dir, tmp_path):
+        """Test that a missing corpus file is reported before fingerprinting."""
+        mock_cache_dir.return_value = str(tmp_path)
+        with pytest.raises(FileNotFoundError, match='File not found'):
+            _load_or_build(2, [tmp_path / 'missing.txt'])
+
+    @patch('lib.MarkovGenerator._compaction_options')
+    @patch('lib.MarkovGenerator.env.get_model_cache_dir')
+    def test_load_or_build_applies_compaction(self, mock_cache_dir, mock_options, tmp_path):
+        """Test that configured compaction is applied and recorded in the fingerprint."""
+        mock_cache_dir.return_value = str(tmp_path)
+        mock_options.return_value = {'collapse_chains': True}
+        with patch('lib.MarkovGenerator._file_path', return_value=[TEST_FILE]):
+            possibles = _load_or_build(2, [TEST_FILE])
+            plain = _build_possibles(prefix_len=2)
+        assert len(possibles) < len(plain)
+        fingerprint = ModelCache.fingerprint([TEST_FILE], 2, {'collapse_chains': True})
+        assert ModelCache.load(ModelCache.model_path(tmp_path, 2), fingerprint) == possibles
+
+    @patch('lib.MarkovGenerator.env.get_min_count', return_value=3)
+    @patch('lib.MarkovGenerator.env.get_collapse_chains', return_value=False)
+    @patch('lib.MarkovGenerator.env.get_max_vocab', return_value=None)
+    def test_compaction_options_from_env(self, *mocks):
+        """Test that _compaction_options reads the environment settings."""
+        assert MarkovGenerator._compaction_options() == {'min_count': 3}
+
+    @patch('lib.MarkovGenerator._file_path')
+    @patch('lib.MarkovGenerator.env.get_temperature')
+    @patch('lib.MarkovGenerator.env.get_model_cache_dir')
+    def test_preload_loads_current_model(self, mock_cache_dir, mock_temp, mock_file_path):
+        """Test that preload loads the model selected by TEMPERATURE."""
+        mock_cache_dir.return_value = None
+        mock_temp.return_value = 0.0
+        mock_file_path.return_value = [TEST_FILE]
+        assert preload() > 0
+        assert list(MarkovGenerator._models) == [(3, (TEST_FILE,))]
+
+
 class TestPickStartKey:
     """Test cases for the _pick_start_key function."""
 
@@ -287,7 +557,7 @@ class TestCreativeAndDeterministic:
         }
         
         _creative()
-        mock_build_possibles.assert_called_once_with(prefix_len=2)
+        mock_build_possibles.assert_called_once_with(prefix_len=2, file_paths=_file_path())
 
     @patch('lib.MarkovGenerator._build_possibles')
     @patch('lib.MarkovGenerator.env.get_max_words')
@@ -300,7 +570,7 @@ class TestCreativeAndDeterministic:
         }
         
         _deterministic()
-        mock_build_possibles.assert_called_once_with(prefix_len=3)
+        mock_build_possibles.assert_called_once_with(prefix_len=3, file_paths=_file_path())
 
 
 class TestRun:
@@ -349,3 +619,67 @@ class TestRun:
         result = run()
         mock_deterministic.assert_called_once()
         assert result == "Deterministic text"
+
+
+class TestOnlineLearning:
+    """Test cases for learn and flush."""
+
+    @pytest.fixture
+    def learning(self, tmp_path):
+        """Enable LEARN_FROM_CHAT with the test corpus and a temporary model cache."""
+        with patch('lib.MarkovGenerator._file_path', return_value=[TEST_FILE]), \
+                patch('lib.MarkovGenerator.env.get_learn_from_chat', return_value=True), \
+                patch('lib.MarkovGenerator.env.get_temperature', return_value=0.8), \
+                patch('lib.MarkovGenerator.env.get_model_cache_dir', return_value=str(tmp_path)):
+            yield tmp_path
+
+    def test_learn_disabled_by_default(self):
+        """Test that learn does nothing unless LEARN_FROM_CHAT is enabled."""
+        with patch('lib.MarkovGenerator.env.get_learn_from_chat', return_value=False):
+            assert MarkovGenerator.learn('Zebras dance tonight') == 0
+        assert not MarkovGenerator._models
+
+    def test_learned_text_is_sampled(self, learning):
+        """Test that learned transitions reach the live model without a rebuild."""
+        assert MarkovGenerator.learn('Zebras dance tonight') == 5
+        possibles = _possibles(prefix_len=2)
+        assert possibles.get(('Zebras', 'dance')) == ['tonight']
+        assert ('Zebras', 'dance') in _start_candidates(possibles)
+
+    def test_flush_saves_learned_text(self, learning):
+        """Test that flush saves the overlay under the corpus fingerprint, next to an untouched model."""
+        MarkovGenerator.learn('Zebras dance tonight')
+        assert MarkovGenerator.flush() == 5
+        fingerprint = ModelCache.fingerprint([TEST_FILE], 2)
+        saved = ModelCache.load(ModelCache.learned_path(learning, 2), fingerprint)
+        assert saved[('Zebras', 'dance')] == ['tonight']
+        assert ('Zebras', 'dance') not in ModelCache.load(ModelCache.model_path(learning, 2), fingerprint)
+        assert MarkovGenerator.flush() == 0
+
+    def test_learned_text_survives_restart(self, learning):
+        """Test that text saved by flush is learned again when the model is reloaded."""
+        MarkovGenerator.learn('Zebras dance tonight')
+        MarkovGenerator.flush()
+        MarkovGenerator._models.clear()
+        assert _possibles(prefix_len=2).get(('Zebras', 'dance')) == ['tonight']
+
+    def test_repeated_flushes_stay_bounded(self, learning):
+        """Test that learning and flushing many times keeps the model and the saved files bounded."""
+        with patch('lib.MarkovGenerator.env.get_learn_max_prefixes', return_value=20):
+            base_len = len(_possibles(prefix_len=2).base)
+            for flush in range(100):
+                MarkovGenerator.learn(f'The quick brown fox{flush} jumps')
+                MarkovGenerator.learn('The quick brown fox jumps')
+                MarkovGenerator.flush()
+                MarkovGenerator._models.clear()
+            possibles = _possibles(prefix_len=2)
+        fingerprint = ModelCache.fingerprint([TEST_FILE], 2)
+        assert len(possibles.base) == len(ModelCache.load(ModelCache.model_path(learning, 2), fingerprint)) == base_len
+        learned = ModelCache.load(ModelCache.learned_path(learning, 2), fingerprint)
+        assert len(learned) <= 20
+        assert all(len(words) <= possibles.max_successors for words in learned.values())
+
+    def test_shared_model_does_not_learn(self, learning):
+        """Test that read-only shared models are left untouched."""
+        with patch('lib.MarkovGenerator._shared_model', return_value=MagicMock()):
+            assert MarkovGenerator.learn('Zebras dance tonight') == 0
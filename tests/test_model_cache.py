@@ -0,0 +1,97 @@
+"""
+Unit tests for ModelCache module.
+"""
+import pytest
+from pathlib import Path
+
+from lib import ModelCache
+
+TEST_FILE = Path(__file__).parent / 'test_data' / 'test_input.txt'
+TEST_FILE2 = Path(__file__).parent / 'test_data' / 'test_input2.txt'
+
+
+class TestModelCache:
+    """Test cases for saving and loading compiled models."""
+
+    def test_model_path_includes_prefix_len(self, tmp_path):
+        """Test that model_path names the file after the prefix length."""
+        assert ModelCache.model_path(tmp_path, 3) == tmp_path / 'model_p3.pkl'
+
+    def test_save_and_load_round_trip(self, tmp_path):
+        """Test that a saved model loads back unchanged."""
+        possibles = {('The', 'quick'): ['brown', 'red'], ('quick', 'brown'): ['fox']}
+        path = ModelCache.save(possibles, tmp_path / 'nested' / 'model.pkl')
+        assert path.exists()
+        assert not path.with_suffix('.pkl.tmp').exists()
+        assert ModelCache.load(path) == possibles
+
+    def test_load_missing_file(self, tmp_path):
+        """Test that load raises FileNotFoundError for a missing model."""
+        with pytest.raises(FileNotFoundError):
+            ModelCache.load(tmp_path / 'missing.pkl')
+
+    def test_fingerprint_is_stable(self):
+        """Test that the same inputs produce the same fingerprint."""
+        assert ModelCache.fingerprint([TEST_FILE], 2) == ModelCache.fingerprint([TEST_FILE], 2)
+
+    def test_fingerprint_depends_on_parameters_and_files(self):
+        """Test that prefix length, file set and file order change the fingerprint."""
+        base = ModelCache.fingerprint([TEST_FILE, TEST_FILE2], 2)
+        assert ModelCache.fingerprint([TEST_FILE, TEST_FILE2], 3) != base
+        assert ModelCache.fingerprint([TEST_FILE], 2) != base
+        assert ModelCache.fingerprint([TEST_FILE2, TEST_FILE], 2) != base
+
+    def test_fingerprint_depends_on_options(self):
+        """Test that build options change the fingerprint, and empty options do not."""
+        base = ModelCache.fingerprint([TEST_FILE], 2)
+        assert ModelCache.fingerprint([TEST_FILE], 2, {}) == base
+        assert ModelCache.fingerprint([TEST_FILE], 2, {'min_count': 2}) != base
+
+    def test_fingerprint_depends_on_content(self, tmp_path):
+        """Test that editing a corpus file changes the fingerprint."""
+        corpus = tmp_path / 'corpus.txt'
+        corpus.write_text('one two three')
+        before = ModelCache.fingerprint([corpus], 2)
+        corpus.write_text('one two four')
+        assert ModelCache.fingerprint([corpus], 2) != before
+
+    def test_load_checks_fingerprint(self, tmp_path):
+        """Test that load rejects a model built with another fingerprint."""
+        path = ModelCache.save({('a', 'b'): ['c']}, tmp_path / 'model.pkl', 'abc')
+        assert ModelCache.load(path, 'abc') == {('a', 'b'): ['c']}
+        with pytest.raises(ModelCache.StaleModelError):
+            ModelCache.load(path, 'def')
+
+    def test_load_rejects_corrupt_file(self, tmp_path):
+        """Test that a truncated or foreign file is reported as stale."""
+        path = tmp_path / 'model.pkl'
+        path.write_bytes(b'not a pickle')
+        with pytest.raises(ModelCache.StaleModelError):
+            ModelCache.load(path)
+
+    def test_save_counts_round_trip(self, tmp_path, monkeypatch):
+        """Test that a model written as counts in several chunks loads as successor lists."""
+        monkeypatch.setattr('lib.ModelCache.CHUNK_PREFIXES', 2)
+        counts = [(('', ''), [('The', 1)]), (('The', 'quick'), [('brown', 2), ('red', 1)]),
+                  (('quick', 'brown'), [('fox', 1)])]
+        path = ModelCache.save_counts(iter(counts), tmp_path / 'model.pkl', 'abc')
+        assert not path.with_suffix('.pkl.tmp').exists()
+        assert ModelCache.load(path, 'abc') == {
+            ('', ''): ['The'], ('The', 'quick'): ['brown', 'brown', 'red'], ('quick', 'brown'): ['fox']}
+        with pytest.raises(ModelCache.StaleModelError):
+            ModelCache.load(path, 'def')
+
+    def test_load_rejects_truncated_counts(self, tmp_path):
+        """Test that a counts file cut off before its end marker is reported as stale."""
+        path = ModelCache.save_counts([(('a', 'b'), [('c', 1)])], tmp_path / 'model.pkl')
+        path.write_bytes(path.read_bytes()[:-4])
+        with pytest.raises(ModelCache.StaleModelError):
+            ModelCache.load(path)
+
+    def test_fingerprint_by_name_does_not_read_files(self, tmp_path):
+        """Test that contents=False needs only the file names."""
+        missing = tmp_path / TEST_FILE.name
+        by_name = ModelCache.fingerprint([missing], 2, contents=False)
+        assert by_name == ModelCache.fingerprint([TEST_FILE], 2, contents=False)
+        assert by_name != ModelCache.fingerprint([TEST_FILE], 2)
+        assert by_name != ModelCache.fingerprint([missing], 3, contents=False)
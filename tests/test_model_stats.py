@@ -0,0 +1,97 @@
+"""
+Unit tests for ModelStats module.
+"""
+import sys
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+
+from lib import Compaction
+from lib.ModelStats import corpus_stats, memory, model_stats, report, token_stats
+
+TEST_FILE = Path(__file__).parent / 'test_data' / 'test_input.txt'
+
+
+class TestMemory:
+    """Test cases for the per-component memory breakdown."""
+
+    def test_components_add_up(self):
+        """Test that the total is the sum of table, keys, lists and strings."""
+        possibles = {('a', 'b'): ['c', 'c'], ('b', 'c'): ['']}
+        breakdown = memory(possibles)
+        assert breakdown['total'] == breakdown['table'] + breakdown['keys'] + breakdown['lists'] + breakdown['strings']
+        assert breakdown['keys'] == 2 * sys.getsizeof(('a', 'b'))
+
+    def test_matches_compaction_model_bytes(self):
+        """Test that Compaction reports the same total."""
+        possibles = {('a', 'b'): ['c'], ('b', 'c'): ['']}
+        assert Compaction.model_bytes(possibles) == memory(possibles)['total']
+
+
+class TestModelStats:
+    """Test cases for the model shape statistics."""
+
+    def test_counts_prefixes_words_and_transitions(self):
+        """Test prefix, transition and vocabulary counts ('' is not a word)."""
+        possibles = {('a', 'b'): ['c', 'c', 'd'], ('b', 'c'): [''], ('b', 'd'): ['e f']}
+        stats = model_stats(possibles)
+        assert stats['prefix_len'] == 2
+        assert stats['prefixes'] == 3
+        assert stats['transitions'] == 5
+        # Multi-word runs count each of their words
+        assert stats['vocabulary'] == 4
+
+    def test_successor_distribution(self):
+        """Test the distinct successors per prefix distribution."""
+        possibles = {('a', str(i)): ['x'] for i in range(8)}
+        possibles[('b', 'b')] = ['x', 'y', 'z']
+        possibles[('c', 'c')] = [str(i) for i in range(6)]
+        successors = model_stats(possibles)['successors']
+        assert successors['max'] == 6
+        assert successors['p50'] == 1
+        assert successors['deterministic_share'] == pytest.approx(0.8)
+        assert successors['histogram'] == {'1': 8, '3-4': 1, '5-8': 1}
+
+    def test_empty_model(self):
+        """Test that an empty model reports zeros."""
+        stats = model_stats({})
+        assert stats['prefixes'] == 0
+        assert stats['successors']['max'] == 0
+
+
+class TestCorpusStats:
+    """Test cases for corpus reports."""
+
+    def test_token_stats_counts_normalization(self, tmp_path):
+        """Test the share of tokens normalize() changes and empties."""
+        corpus = tmp_path / 'corpus.txt'
+        corpus.write_text('"Hello" world " (it) ok\n', encoding='utf-8')
+        tokens = token_stats([corpus])
+        assert tokens['raw_tokens'] == 5
+        assert tokens['changed_tokens'] == 3
+        assert tokens['removed_tokens'] == 1
+        assert tokens['removed_share'] == pytest.approx(0.2)
+        assert tokens['removed_char_share'] == pytest.approx(5 / 19)
+
+    def test_corpus_stats_per_prefix_len(self):
+        """Test that every prefix length is built and timed."""
+        stats = corpus_stats([TEST_FILE], prefix_lens=(1, 2))
+        assert stats['files'] == ['test_input.txt']
+        assert stats['tokens']['raw_tokens'] == 29
+        assert set(stats['models']) == {1, 2}
+        assert stats['models'][2]['prefix_len'] == 2
+        assert stats['models'][2]['build_seconds'] >= 0
+
+    def test_report_adds_combined_corpus(self, tmp_path):
+        """Test that report covers each file and then the whole set."""
+        other = tmp_path / 'other.txt'
+        other.write_text('Another tiny corpus.\n', encoding='utf-8')
+        with patch('lib.MarkovGenerator._file_path', return_value=[TEST_FILE, other]):
+            corpora = report(prefix_lens=(2,))
+        assert [corpus['files'] for corpus in corpora] == [['test_input.txt'], ['other.txt'],
+                                                           ['test_input.txt', 'other.txt']]
+
+    def test_report_missing_file(self):
+        """Test that a missing corpus raises FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            report(['missing_12345.txt'])
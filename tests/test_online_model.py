@@ -0,0 +1,124 @@
+"""
+Unit tests for OnlineModel module.
+"""
+import random
+from collections import Counter
+
+from lib.OnlineModel import OnlineModel
+from lib.MarkovGenerator import _walk
+
+
+def _base():
+    return {('', ''): ['The'], ('', 'The'): ['cat'], ('The', 'cat'): ['sat'], ('cat', 'sat'): ['']}
+
+
+class TestLearn:
+    """Test cases for learning into the overlay."""
+
+    def test_learn_adds_padded_transitions(self):
+        """Test that a message is learned with '' padding on both sides."""
+        model = OnlineModel(_base())
+        assert model.learn('The dog ran') == 5
+        assert model[('The', 'dog')] == ['ran']
+        assert model[('dog', 'ran')] == ['']
+        assert model[('ran', '')] == ['']
+
+    def test_learn_normalizes_like_the_corpus(self):
+        """Test that messages are tokenized with the corpus normalization."""
+        model = OnlineModel(_base())
+        assert model.learn('   ') == 0
+        model.learn('The "dog" ran')
+        assert ('The', 'dog') in model
+
+    def test_existing_prefix_combines_successors(self):
+        """Test that learned successors are sampled alongside the base ones."""
+        model = OnlineModel(_base())
+        model.learn('The cat ran')
+        successors = model[('The', 'cat')]
+        assert len(successors) == 2
+        assert sorted(successors[i] for i in range(len(successors))) == ['ran', 'sat']
+        random.seed(0)
+        seen = Counter(random.choice(model[('The', 'cat')]) for _ in range(200))
+        assert set(seen) == {'ran', 'sat'}
+
+    def test_base_model_untouched(self):
+        """Test that learning never modifies the base model."""
+        base = _base()
+        model = OnlineModel(base)
+        model.learn('The cat ran')
+        assert base == _base()
+
+    def test_walk_follows_learned_text(self):
+        """Test that _walk can generate learned text through the overlay."""
+        model = OnlineModel({('a', 'b'): ['c']})
+        model.learn('Zebras dance tonight')
+        assert list(_walk(model, ('Zebras', 'dance'), 3)) == ['Zebras', 'dance', 'tonight', '', '']
+
+
+class TestBounds:
+    """Test cases for the overlay size limits."""
+
+    def test_least_recently_learned_prefix_is_evicted(self):
+        """Test that the overlay never holds more than max_prefixes prefixes."""
+        model = OnlineModel(_base(), max_prefixes=4)
+        model.learn('one two three four five six')
+        assert model.stats()['overlay_prefixes'] == 4
+        assert model.stats()['evicted'] > 0
+        assert ('one', 'two') not in model
+        assert ('five', 'six') in model
+
+    def test_successors_per_prefix_are_capped(self):
+        """Test that repeated messages keep only the newest max_successors successors."""
+        model = OnlineModel({('a', 'b'): ['c']}, max_successors=3)
+        for word in ['w1', 'w2', 'w3', 'w4']:
+            model.learn(f'x {word}')
+        assert model[('', 'x')] == ['w2', 'w3', 'w4']
+
+
+class TestSnapshot:
+    """Test cases for saving and restoring the overlay."""
+
+    def test_snapshot_copies_overlay(self):
+        """Test that snapshot returns the learned lists in learning order and resets pending."""
+        base = _base()
+        model = OnlineModel(base)
+        model.learn('The cat ran')
+        assert model.pending == 5
+        learned = model.snapshot()
+        assert list(learned)[0] == ('', '')
+        assert learned[('The', 'cat')] == ['ran']
+        assert model.pending == 0
+        assert model.stats()['overlay_prefixes'] == len(learned)
+        assert base == _base()
+        learned[('The', 'cat')].append('sat')
+        assert model[('The', 'cat')][1] == 'ran'
+        assert len(model[('The', 'cat')]) == 2
+
+    def test_restore_applies_bounds(self):
+        """Test that a restored snapshot keeps the newest prefixes and successors."""
+        model = OnlineModel(_base(), max_prefixes=2, max_successors=2)
+        model.restore({('a', 'b'): ['c'], ('b', 'c'): ['d', 'e', 'f'], ('c', 'd'): ['e'], ('x',): ['y']})
+        assert model.snapshot() == {('b', 'c'): ['e', 'f'], ('c', 'd'): ['e']}
+
+    def test_repeated_learn_and_restore_stays_bounded(self):
+        """Test that learning across many save/restore cycles never grows past the bounds."""
+        base = _base()
+        learned = {}
+        for flush in range(100):
+            model = OnlineModel(base, max_prefixes=50, max_successors=8)
+            model.restore(learned)
+            for message in range(10):
+                model.learn(f'The cat saw bird{flush} and mouse{message}')
+            learned = model.snapshot()
+        assert base == _base()
+        assert len(learned) <= 50
+        assert all(len(words) <= 8 for words in learned.values())
+        assert sum(len(words) for words in learned.values()) <= 50 * 8
+
+    def test_mapping_views_include_overlay(self):
+        """Test that iteration and len count new overlay prefixes once."""
+        model = OnlineModel(_base())
+        model.learn('The dog')
+        keys = list(model)
+        assert len(keys) == len(set(keys)) == len(model)
+        assert ('The', 'dog') in keys
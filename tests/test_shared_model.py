@@ -0,0 +1,121 @@
+"""
+Unit tests for SharedModel module.
+"""
+import multiprocessing
+import random
+import pytest
+from pathlib import Path
+
+from lib import Compaction
+from lib.MarkovGenerator import _build_possibles
+from lib.SharedModel import SharedModel
+
+TEST_FILE = Path(__file__).parent / 'test_data' / 'test_input.txt'
+
+
+@pytest.fixture
+def possibles():
+    return _build_possibles(prefix_len=2, file_paths=[TEST_FILE])
+
+
+def _successors(model, key):
+    """Decode the successor multiset of a word-tuple key from a SharedModel."""
+    ids = {model._token(token_id): token_id for token_id in range(len(model._token_offsets) - 1)}
+    row = model._find(tuple(ids[word] for word in key))
+    assert row >= 0
+    start, end = model._succ_offsets[row], model._succ_offsets[row + 1]
+    return sorted(model._token(token_id) for token_id in model._successors[start:end])
+
+
+def _attach_and_walk(name, queue):
+    model = SharedModel.attach(name)
+    queue.put((len(model), list(model.walk(5))))
+    model.close()
+
+
+class TestPack:
+    """Test cases for packing a model into the shared layout."""
+
+    def test_pack_round_trip(self, possibles):
+        """Test that every prefix keeps its successor multiset."""
+        model = SharedModel(SharedModel.pack(possibles, 'abc123'))
+        assert len(model) == len(possibles)
+        assert model.prefix_len == 2
+        assert model.fingerprint == 'abc123'
+        for key, words in possibles.items():
+            assert _successors(model, key) == sorted(words)
+
+    def test_pack_rejects_empty_model(self):
+        """Test that an empty model cannot be packed."""
+        with pytest.raises(ValueError):
+            SharedModel.pack({})
+
+    def test_rejects_foreign_buffer(self):
+        """Test that a buffer without the header is rejected."""
+        with pytest.raises(ValueError):
+            SharedModel(bytes(256))
+
+    def test_find_missing_key(self, possibles):
+        """Test that an unknown prefix is reported as missing."""
+        model = SharedModel(SharedModel.pack(possibles))
+        assert model._find((10 ** 6, 10 ** 6)) == -1
+
+
+class TestWalk:
+    """Test cases for sampling from a SharedModel."""
+
+    def test_walk_follows_transitions(self, possibles):
+        """Test that generated words only follow transitions of the model."""
+        model = SharedModel(SharedModel.pack(possibles))
+        for _ in range(20):
+            words = list(model.walk(10))
+            assert len(words) == 12
+            assert words[0][0].isupper()
+            for i in range(2, len(words)):
+                key = (words[i - 2], words[i - 1])
+                assert words[i] in possibles.get(key, [''])
+
+    def test_walk_with_collapsed_runs(self, possibles):
+        """Test that multi-word runs are emitted word by word with the right next key."""
+        compacted = Compaction.compact(possibles, collapse_chains=True)
+        model = SharedModel(SharedModel.pack(compacted))
+        random.seed(3)
+        for _ in range(20):
+            words = list(model.walk(10))
+            assert len(words) == 12
+            for i in range(2, len(words)):
+                key = (words[i - 2], words[i - 1])
+                assert words[i] in possibles.get(key, [''])
+
+
+class TestSharing:
+    """Test cases for files and shared memory segments."""
+
+    def test_save_and_open(self, possibles, tmp_path):
+        """Test that a saved model is memory-mapped and sampled in place."""
+        path = SharedModel.save(possibles, tmp_path / 'model.bin', 'fp')
+        model = SharedModel.open(path)
+        try:
+            assert model.name is None
+            assert model.nbytes == path.stat().st_size
+            assert model.fingerprint == 'fp'
+            assert len(list(model.walk(5))) == 7
+        finally:
+            model.close()
+        model.close()
+
+    def test_publish_and_attach_from_other_process(self, possibles):
+        """Test that another process attaches to the segment without copying the model."""
+        model = SharedModel.publish(possibles)
+        try:
+            context = multiprocessing.get_context('spawn')
+            queue = context.Queue()
+            process = context.Process(target=_attach_and_walk, args=(model.name, queue))
+            process.start()
+            count, words = queue.get(timeout=30)
+            process.join(timeout=30)
+            assert count == len(possibles)
+            assert len(words) == 7
+        finally:
+            model.close()
+            model.unlink()
@@ -0,0 +1,109 @@
+"""
+Unit tests for StreamingBuilder module.
+"""
+import random
+import sys
+import tracemalloc
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+
+from lib import Compaction, ModelCache, StreamingBuilder
+from lib.MarkovGenerator import _build_possibles
+
+TEST_FILES = [
+    Path(__file__).parent / 'test_data' / 'test_input.txt',
+    Path(__file__).parent / 'test_data' / 'test_input2.txt',
+]
+
+
+def _normalized(possibles):
+    """Compare models by successor multiset, ignoring list order."""
+    return {key: sorted(words) for key, words in possibles.items()}
+
+
+class TestBuild:
+    """Test cases for the build function."""
+
+    @pytest.mark.parametrize('prefix_len', [1, 2, 3])
+    def test_build_matches_in_memory_builder(self, prefix_len):
+        """Test that the streaming build equals _build_possibles without spilling."""
+        expected = _build_possibles(prefix_len=prefix_len, file_paths=TEST_FILES)
+        assert _normalized(StreamingBuilder.build(TEST_FILES, prefix_len)) == _normalized(expected)
+
+    @pytest.mark.parametrize('budget_entries', [1, 3, 10])
+    def test_build_with_spills_matches(self, budget_entries, tmp_path):
+        """Test that spilling to disk under a tiny budget gives the same model."""
+        expected = _build_possibles(prefix_len=2, file_paths=TEST_FILES)
+        budget = budget_entries * StreamingBuilder.ENTRY_BYTES
+        possibles = StreamingBuilder.build(TEST_FILES, 2, memory_budget=budget, tmp_dir=tmp_path)
+        assert _normalized(possibles) == _normalized(expected)
+        # Spill files are removed once the build is done
+        assert list(tmp_path.iterdir()) == []
+
+    @patch('lib.StreamingBuilder.MAX_MERGE_FANIN', 2)
+    def test_build_with_multi_pass_merge(self, tmp_path):
+        """Test that merging in several passes gives the same model."""
+        expected = _build_possibles(prefix_len=2, file_paths=TEST_FILES)
+        possibles = StreamingBuilder.build(TEST_FILES, 2, memory_budget=StreamingBuilder.ENTRY_BYTES,
+                                           tmp_dir=tmp_path)
+        assert _normalized(possibles) == _normalized(expected)
+
+    def test_build_file_not_found(self, tmp_path):
+        """Test that build raises FileNotFoundError for a missing corpus."""
+        with pytest.raises(FileNotFoundError):
+            StreamingBuilder.build([tmp_path / 'missing.txt'], 2)
+
+
+class TestBuildFile:
+    """Test cases for the build_file function."""
+
+    def test_build_file_matches_build(self, tmp_path):
+        """Test that the model file loads as the same model build() returns."""
+        path = tmp_path / 'model.pkl'
+        prefixes = StreamingBuilder.build_file(TEST_FILES, 2, path, 'abc', memory_budget=StreamingBuilder.ENTRY_BYTES,
+                                               tmp_dir=tmp_path)
+        expected = StreamingBuilder.build(TEST_FILES, 2)
+        assert prefixes == len(expected)
+        assert ModelCache.load(path, 'abc') == expected
+
+    def test_build_file_prunes_rare_successors(self, tmp_path):
+        """Test that min_count prunes like Compaction.compact."""
+        path = tmp_path / 'model.pkl'
+        StreamingBuilder.build_file(TEST_FILES, 2, path, min_count=2)
+        expected = Compaction.compact(StreamingBuilder.build(TEST_FILES, 2), min_count=2)
+        assert ModelCache.load(path) == expected
+
+    def test_build_file_stays_within_budget(self, tmp_path):
+        """Test that compiling to a file never holds much more than the memory budget."""
+        rng = random.Random(0)
+        # Interned up front, so growing the interpreter's intern table is not measured
+        vocab = [sys.intern(f'w{i}') for i in range(2000)]
+        corpus = tmp_path / 'corpus.txt'
+        corpus.write_text('\n'.join(' '.join(rng.choices(vocab, k=20)) for _ in range(1000)))
+        budget = 256 * 1024
+
+        tracemalloc.start()
+        try:
+            prefixes = StreamingBuilder.build_file([corpus], 2, tmp_path / 'model.pkl', memory_budget=budget,
+                                                   tmp_dir=tmp_path)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # The transition table alone would need over ten times the budget
+        assert prefixes * StreamingBuilder.ENTRY_BYTES > 10 * budget
+        assert peak < 2 * budget
+
+
+class TestIterCounts:
+    """Test cases for the iter_counts function."""
+
+    def test_iter_counts_sorted_and_summed(self, tmp_path):
+        """Test that prefixes come out sorted with summed successor counts."""
+        corpus = tmp_path / 'corpus.txt'
+        corpus.write_text('a b a b a c')
+        items = list(StreamingBuilder.iter_counts([corpus], 1, memory_budget=1))
+        prefixes = [prefix for prefix, _ in items]
+        assert prefixes == sorted(prefixes)
+        assert dict(items)[('a',)] == [('b', 2), ('c', 1)]
+        assert dict(items)[('c',)] == [('', 1)]